@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# AR 마커 A/B 판단 (메시지마다 바로 갱신)
+# - 한 프레임의 모든 마커를 같이 봄: 목표 ID마다 거리 안에 보였으면 1표
+# - ID별 최근 window 프레임의 표를 고정 크기 링 버퍼에 저장 (합계는 들어오고 나가는 표만 더하고 뺌)
+# - 한 ID의 표가 min_votes 이상이고 다른 ID보다 margin 이상 많으면 그 ID로 결정하고 이후로는 바꾸지 않음
+
+import numpy as np
+
+
+class MarkerVote:
+    def __init__(self, target_ids, window=8, min_votes=1, margin=1, max_distance=2.5):
+        self.target_ids = np.asarray(target_ids, dtype=np.int64)
+        self.window = window
+        self.min_votes = min_votes
+        self.margin = margin
+        self.max_distance = max_distance  # 카메라 기준 z [m]
+
+        self.votes = np.zeros((window, len(self.target_ids)), dtype=np.int64)  # 링 버퍼 (프레임 x 목표 ID)
+        self.totals = np.zeros(len(self.target_ids), dtype=np.int64)
+        self.index = 0
+        self.frames = 0
+        self.decision = None  # 결정된 목표 ID (아직 없으면 None)
+
+    def update(self, ids, distances):
+        # 한 프레임의 마커 (ids, distances: 같은 길이의 배열) -> 결정된 ID 또는 None
+        ids = np.asarray(ids, dtype=np.int64)
+        near = ids[np.asarray(distances) <= self.max_distance]
+        present = (near[:, None] == self.target_ids[None, :]).any(axis=0).astype(np.int64)
+
+        self.totals += present - self.votes[self.index]
+        self.votes[self.index] = present
+        self.index = (self.index + 1) % self.window
+        self.frames += 1
+
+        if self.decision is None and len(self.target_ids) > 0:
+            best = int(np.argmax(self.totals))
+            others = np.delete(self.totals, best)
+            second = int(others.max()) if others.size else 0
+            if self.totals[best] >= self.min_votes and self.totals[best] - second >= self.margin:
+                self.decision = int(self.target_ids[best])
+        return self.decision
+
+    def confidence(self):
+        # 목표 ID별 최근 window 프레임 중 보인 비율
+        return self.totals / max(min(self.frames, self.window), 1)
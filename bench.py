@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 계획/제어 경로 처리 시간 벤치마크 (ROS 없이, fake_ros 메시지 사용)
+# - 합성 장면: 콘 5~1000개, 스캔 360~4000빔, 각각 깨끗한 입력 / 잡음+누락 입력
+# - 대상: Rubber_cone.obstacle_callback (콘 좌표 채우기 + ConeFeatures), Rubber_cone.scan_callback (스캔 콘 검출),
+#         Rubber_cone.rubber_cone (좌/우 라인, 중앙선, 조향 계산), Tunnel.lidar_callback, PIDController.compute
+# - 케이스마다 프레임별 시간(중앙값/p99 [us])과 프레임당 최대 메모리 할당량(tracemalloc peak [KiB])을 잼
+# - 결과를 기준 파일(JSON)로 저장하고, 다음 실행에서 기준보다 threshold 이상 느려지거나 할당이 늘면 종료 코드 1
+#   (케이스마다 바로 앞에서 고정 작업(calibrate)도 같이 잼, --normalize를 주면 그 비율로 기준 시간을 보정
+#    -> 컴퓨터 전체 속도 변화(클럭, 다른 부하)는 회귀로 보지 않음, calibrate 자체도 흔들리므로 보정은 ±MAX_NORMALIZE까지만)
+#   (기준 파일은 측정한 컴퓨터에서만 의미가 있으므로 차량/개발 PC마다 따로 저장)
+#
+# 실행 예:
+#   python3 bench.py --save bench_baseline.json                    # 기준 저장
+#   python3 bench.py --baseline bench_baseline.json --threshold 0.3   # 변경 후 비교 (회귀로 보이는 케이스는 --retries번 다시 잼)
+#   python3 bench.py --baseline bench_baseline.json --normalize       # 컴퓨터 속도 변화 보정 (보정 전 비교도 같이 출력)
+#   python3 bench.py --filter tunnel --frames 100                   # 일부 케이스만
+
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+from math import pi, radians
+
+os.environ.setdefault('AUTORACE_INSTRUMENT', '0')  # 노드의 측정/내보내기는 끔 (시간은 여기서 직접 잼)
+os.environ.setdefault('AUTORACE_LOG_ROSOUT', '0')
+
+import fake_ros
+fake_ros.install()
+import tunnel
+import control
+import rubber_cone
+from cone_planner import random_cone_scene
+from scan_cones import cone_scan_ranges
+from scan_utils import ScanGeometry
+from wall_fit import corridor_ranges
+
+########### 변경 가능 ##############
+CONE_COUNTS = (5, 20, 50, 100, 200, 500, 1000)
+SCAN_BEAMS = (360, 720, 1440, 2000, 4000)
+CONDITIONS = {  # 이름: (위치/거리 잡음 표준편차 [m], 누락 비율, 가짜 검출 비율)
+    'clean': (0.0, 0.0, 0.0),
+    'noisy': (0.03, 0.15, 0.05),
+}
+SCENES = 20 # 케이스마다 만들어 두고 돌려 쓰는 서로 다른 장면 수
+PID_BATCH = 1000 # PIDController.compute는 한 번이 너무 짧아서 이만큼 묶어서 잰 뒤 나눔
+ROUNDS = 3 # 시간 측정을 이만큼 반복해서 가장 빠른 회차의 중앙값/p99를 사용 (다른 프로세스 부하로 인한 잡음 감소)
+ALLOC_FRAMES = 10 # 할당량을 재는 프레임 수 (tracemalloc은 느려서 시간 측정과 따로 실행)
+MIN_DELTA_US = 5.0 # 측정 한 번(batch 프레임)의 시간 차이가 이보다 작으면 threshold를 넘어도 회귀로 보지 않음 (측정 잡음)
+MIN_DELTA_BYTES = 1024 # 할당량도 마찬가지
+MAX_NORMALIZE = 0.2 # --normalize에서 기준 시간 보정 비율의 한계 (0.2 = 0.8배 ~ 1.2배)
+##################################
+
+
+class Case:
+    def __init__(self, name, inputs, run, prepare=None, batch=1):
+        self.name = name
+        self.inputs = inputs  # 장면별 입력 (prepare를 거쳐 run에 넘김)
+        self.run = run  # 시간을 재는 부분
+        self.prepare = prepare  # 시간에 넣지 않는 준비 (예: rubber_cone 전에 콜백으로 프레임 공개)
+        self.batch = batch  # run 한 번이 처리하는 프레임 수
+
+
+########################## 합성 장면 ##########################
+
+def cone_scene(n, condition, seed):
+    # 콘 통로 (전방 -x) + 잡음, 누락, 가짜 검출
+    noise, dropout, clutter = CONDITIONS[condition]
+    rng = np.random.default_rng(seed)
+    points = random_cone_scene(n, noise=noise, seed=seed)
+    if dropout > 0:
+        points = points[rng.random(len(points)) >= dropout]
+    if clutter > 0:
+        extra = rng.uniform((-3.0, -1.5), (0.0, 1.5), (int(np.ceil(n * clutter)), 2))
+        points = np.concatenate((points, extra))
+    return points
+
+
+def scan_geometry_for(beams):
+    increment = 2 * pi / beams
+    return ScanGeometry(-pi, pi - increment, increment, beams)
+
+
+def add_scan_noise(ranges, condition, rng):
+    # 거리 잡음 + 누락 빔 (반사 없음 = inf)
+    noise, dropout, clutter = CONDITIONS[condition]
+    ranges = ranges.astype(np.float64)
+    if noise > 0:
+        ranges = ranges + rng.normal(0, noise, len(ranges))
+    if dropout > 0:
+        ranges[rng.random(len(ranges)) < dropout] = np.inf
+    return ranges.astype(np.float32)
+
+
+def make_scan(geometry, ranges, seq):
+    return fake_ros.LaserScan(fake_ros.Header(fake_ros.Time(1.0), seq=seq), geometry.angle_min, geometry.angle_max,
+                              geometry.angle_increment, 0.05, 12.0, ranges)
+
+
+def make_obstacles(points, seq):
+    circles = [fake_ros.CircleObstacle(fake_ros.Point(x, y), 0.05) for x, y in points.tolist()]
+    return fake_ros.Obstacles(fake_ros.Header(fake_ros.Time(1.0), seq=seq), circles)
+
+
+def tunnel_scans(beams, condition):
+    geometry = scan_geometry_for(beams)
+    rng = np.random.default_rng(beams)
+    scans = []
+    for seq in range(SCENES):
+        left, right = rng.uniform(0.2, 0.4, 2)
+        ranges = corridor_ranges(geometry, left, right, radians(rng.uniform(-10, 10)))
+        scans.append(make_scan(geometry, add_scan_noise(ranges, condition, rng), seq))
+    return scans
+
+
+def cone_scans(beams, condition):
+    geometry = scan_geometry_for(beams)
+    rng = np.random.default_rng(beams)
+    scans = []
+    for seq in range(SCENES):
+        centers = cone_scene(20, condition, seq)
+        scans.append(make_scan(geometry, add_scan_noise(cone_scan_ranges(geometry, centers), condition, rng), seq))
+    return scans
+
+
+########################## 노드 ##########################
+
+def new_node(cls, **params):
+    # fake_ros 위에서 노드 생성 (입력 예약이 없으므로 생성자 안의 spin은 바로 끝남), 발행 비용은 제외
+    core = fake_ros.core
+    core.reset(start_time=1.0)
+    node = cls()
+    core.shutdown = False
+    for name, value in params.items():
+        setattr(node, name, value)
+    node.target_control_pub.publish = lambda msg: None
+    return node
+
+
+def build_cases():
+    cases = []
+    for condition in CONDITIONS:
+        for n in CONE_COUNTS:
+            messages = [make_obstacles(cone_scene(n, condition, seed), seed) for seed in range(SCENES)]
+
+            # 콜백만 (계획은 rubber_cone 케이스에서 따로)
+            node = new_node(rubber_cone.Rubber_cone, planning_mode='rate')
+            cases.append(Case(f"rubber_cone.obstacle_callback cones={n} {condition}", messages, node.obstacle_callback))
+
+            for mode in ('legacy', 'arc'):
+                node = new_node(rubber_cone.Rubber_cone, planning_mode='rate', lookahead_mode=mode)
+                node.build_planner()
+
+                def prepare(msg, node=node):
+                    node.obstacle_callback(msg)
+                    return node.cone_frames.latest
+                cases.append(Case(f"rubber_cone.rubber_cone cones={n} {condition} {mode}", messages, node.rubber_cone, prepare))
+
+        for beams in SCAN_BEAMS:
+            node = new_node(rubber_cone.Rubber_cone, planning_mode='rate', obstacle_source='scan')
+            cases.append(Case(f"rubber_cone.scan_callback beams={beams} {condition}", cone_scans(beams, condition), node.scan_callback))
+
+            scans = tunnel_scans(beams, condition)
+            for mode in ('two_beam', 'lsq'):
+                node = new_node(tunnel.Tunnel, estimation_mode=mode)
+                cases.append(Case(f"tunnel.lidar_callback beams={beams} {condition} {mode}", scans, node.lidar_callback))
+
+    rng = np.random.default_rng(0)
+    errors = [rng.normal(0, 0.1, PID_BATCH).tolist() for _ in range(SCENES)]
+    pid = tunnel.PIDController(0.6, 0.004, 0.8)
+
+    def tunnel_pid(batch):
+        for error in batch:
+            pid.compute(error)
+    cases.append(Case("tunnel.PIDController.compute", errors, tunnel_pid, batch=PID_BATCH))
+
+    speed_pid = control.PIDController(1.0, 0.0, 0.0)
+
+    def control_pid(batch):
+        for current in batch:
+            speed_pid.compute(0.4, current)
+    cases.append(Case("control.PIDController.compute", errors, control_pid, batch=PID_BATCH))
+    return cases
+
+
+########################## 측정 ##########################
+
+def measure(case, frames, warmup=5):
+    inputs = case.inputs
+    calibration = calibrate()  # 같은 시점의 컴퓨터 속도 (재측정할 때도 같이 다시 잼)
+    for i in range(warmup):
+        arg = inputs[i % len(inputs)]
+        case.run(case.prepare(arg) if case.prepare else arg)
+
+    # 시간: 프레임마다 따로 잼 (GC가 끼어들지 않도록 끄고 측정), ROUNDS번 중 중앙값이 가장 작은 회차 사용
+    best = None
+    times = np.zeros(frames)
+    for _ in range(ROUNDS):
+        gc.collect()
+        gc.disable()
+        try:
+            for i in range(frames):
+                arg = inputs[i % len(inputs)]
+                if case.prepare:
+                    arg = case.prepare(arg)
+                start = time.perf_counter()
+                case.run(arg)
+                times[i] = time.perf_counter() - start
+        finally:
+            gc.enable()
+        median, p99 = np.percentile(times * 1e6 / case.batch, (50, 99))
+        if best is None or median < best[0]:
+            best = (median, p99)
+
+    # 할당: 프레임 하나를 처리하는 동안 늘어난 최대 메모리
+    allocations = np.zeros(ALLOC_FRAMES)
+    tracemalloc.start()
+    try:
+        for i in range(ALLOC_FRAMES):
+            arg = inputs[i % len(inputs)]
+            if case.prepare:
+                arg = case.prepare(arg)
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            case.run(arg)
+            allocations[i] = tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    allocations /= case.batch
+
+    return dict(frames=frames, batch=case.batch, median_us=float(best[0]), p99_us=float(best[1]),
+                alloc_bytes=float(np.median(allocations)), calibration_us=calibration)
+
+
+def calibrate(repeat=200):
+    # 노드 코드와 비슷한 파이썬 루프 + 작은 numpy 연산으로 된 고정 작업 시간 [us] (ROUNDS번 중 최소)
+    values = np.random.default_rng(0).random(500)
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            total = 0.0
+            for value in values[:100].tolist():
+                total += value * value
+            np.sort(values)
+            np.hypot(values, values).argmin()
+        best = min(best, (time.perf_counter() - start) / repeat * 1e6)
+    return best
+
+
+def speed_ratio(result, base, default_calibration):
+    # 지금 컴퓨터가 기준을 잴 때보다 느린 비율 (케이스별 calibrate 비교, ±MAX_NORMALIZE로 제한)
+    ratio = result['calibration_us'] / base.get('calibration_us', default_calibration)
+    return min(max(ratio, 1 - MAX_NORMALIZE), 1 + MAX_NORMALIZE)
+
+
+def regression_notes(result, base, threshold, speed):
+    # speed: 기준 시간에 곱하는 비율 (1.0이면 보정 없음)
+    notes = []
+    for key, min_delta, unit, scale in (('median_us', MIN_DELTA_US, 'us', 1.0), ('alloc_bytes', MIN_DELTA_BYTES, 'KiB', 1 / 1024)):
+        expected = base[key] * speed if key == 'median_us' else base[key]
+        delta = result[key] - expected
+        if delta * result.get('batch', 1) > min_delta and result[key] > expected * (1 + threshold):
+            notes.append(f"{key} {expected * scale:.1f} -> {result[key] * scale:.1f}{unit} "
+                         f"(+{delta / max(expected, 1e-9) * 100:.0f}%)")
+    return notes
+
+
+def compare(results, baseline, threshold, default_calibration=None):
+    # default_calibration: 주면 케이스별로 기준 시간을 보정 (기준 파일에 케이스별 calibrate가 없으면 이 값 사용)
+    # -> (비교 결과 줄 목록, 회귀 케이스 이름 목록), 보정할 때는 보정 전 기준으로만 넘는 케이스도 따로 표시
+    lines, regressions = [], []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name}: not in baseline")
+            continue
+        raw = regression_notes(result, base, threshold, 1.0)
+        if default_calibration is None:
+            notes = raw
+        else:
+            speed = speed_ratio(result, base, default_calibration)
+            notes = regression_notes(result, base, threshold, speed)
+            if notes:
+                notes.append(f"machine speed x{speed:.2f}, unscaled: " + (', '.join(raw) if raw else "ok"))
+            elif raw:
+                lines.append(f"unscaled only (not counted) {name}: " + ', '.join(raw) + f", machine speed x{speed:.2f}")
+        if notes:
+            regressions.append(name)
+            lines.append(f"REGRESSION {name}: " + ', '.join(notes))
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=200, help="케이스마다 시간을 재는 프레임 수")
+    parser.add_argument('--filter', default=None, help="이름에 이 문자열이 들어간 케이스만 실행")
+    parser.add_argument('--save', help="결과를 기준 파일(JSON)로 저장")
+    parser.add_argument('--baseline', help="비교할 기준 파일 (회귀가 있으면 종료 코드 1)")
+    parser.add_argument('--threshold', type=float, default=0.3, help="허용 증가 비율 (0.3 = 30%%)")
+    parser.add_argument('--retries', type=int, default=2, help="회귀로 보이는 케이스를 다시 재는 횟수 (더 빠른 결과 사용)")
+    parser.add_argument('--normalize', action='store_true',
+                        help=f"케이스별 calibrate 비율로 기준 시간을 보정 (최대 ±{MAX_NORMALIZE * 100:.0f}%%)")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases() if args.filter is None or args.filter in case.name]
+    results = {}
+    width = max((len(case.name) for case in cases), default=0)
+    print(f"{'case':<{width}}  {'median':>10}  {'p99':>10}  {'alloc':>10}")
+    for case in cases:
+        result = measure(case, args.frames)
+        results[case.name] = result
+        print(f"{case.name:<{width}}  {result['median_us']:8.1f}us  {result['p99_us']:8.1f}us  "
+              f"{result['alloc_bytes'] / 1024:7.1f}KiB")
+    calibration = float(np.median([result['calibration_us'] for result in results.values()])) if results else 0.0
+    print(f"calibration {calibration:.1f}us (median)")
+
+    if args.save:
+        meta = dict(time=time.strftime('%Y-%m-%d %H:%M:%S'), machine=platform.machine(), processor=platform.processor(),
+                    python=platform.python_version(), numpy=np.__version__, frames=args.frames, calibration_us=calibration)
+        with open(args.save, 'w') as f:
+            json.dump(dict(meta=meta, cases=results), f, indent=1, sort_keys=True)
+        print(f"saved {len(results)} cases to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base_calibration = baseline['meta'].get('calibration_us', calibration)
+        normalize = f"normalized per case within ±{MAX_NORMALIZE * 100:.0f}%" if args.normalize else "not normalized"
+        print(f"machine speed vs baseline: x{calibration / base_calibration:.2f} (median calibration, {normalize})")
+        default_calibration = base_calibration if args.normalize else None
+        baseline = baseline['cases']
+        lines, regressions = compare(results, baseline, args.threshold, default_calibration)
+        for _ in range(args.retries):
+            # 일시적인 부하로 느려진 경우를 거르기 위해 회귀 케이스만 다시 재서 더 빠른 쪽을 사용
+            if not regressions:
+                break
+            for case in cases:
+                if case.name in regressions:
+                    result = measure(case, args.frames)
+                    if result['median_us'] < results[case.name]['median_us']:
+                        results[case.name] = result
+            lines, regressions = compare(results, baseline, args.threshold, default_calibration)
+        for line in lines:
+            print(line)
+        print(f"{len(regressions)} regressions in {len(results)} cases (threshold {args.threshold * 100:.0f}%)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
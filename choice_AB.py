@@ -2,92 +2,79 @@
 # -*- coding: utf-8 -*-
 
 import rospy
+import instrument
+import logger
+import numpy as np
 from ar_track_alvar_msgs.msg import AlvarMarkers
 from std_msgs.msg import Int32, Bool
+from ar_vote import MarkerVote
 
 class AR:
     def __init__(self):
         rospy.init_node('Choice_AB')
+        instrument.start_export('choice_AB')
 
-        self.lane_switch = rospy.Publisher('/direction_flag', Int32, queue_size=1)
+        # 결정은 한 번만 발행하고 latch로 유지 (나중에 구독한 노드도 마지막 값을 받음)
+        self.lane_switch = rospy.Publisher('/direction_flag', Int32, queue_size=1, latch=True)
         self.switch_data = Int32()
-
-        self.ar_markers = []
-
-        rospy.Subscriber('/ar_pose_marker', AlvarMarkers, self.ar_callback, queue_size=1)
-        self.parking_pub = rospy.Publisher("/parking_flag", Bool, queue_size=1)
-        self.is_ar_markers = False
-        self.ar_markers = []
+        self.parking_pub = rospy.Publisher("/parking_flag", Bool, queue_size=1, latch=True)
         self.parking_msg = Bool()
 
         ############## 변경 가능한 파라미터 ###############
         self.target_ar_id1 = 0 # A(왼쪽)
         self.target_ar_id2 = 4 # B(오른쪽)
-        self.counting_to_need = 1
+        self.counting_to_need = 1 # 최근 vote_window 프레임 중 이 횟수 이상 보이면 결정
         self.distance_from_ar = 2.5
+        self.vote_window = 8 # ID별 표를 모으는 최근 프레임 수
+        self.vote_margin = 1 # 결정하려면 다른 ID보다 이만큼 표가 많아야 함
         ##############################################
 
-        self.ar_id = None
-        self.ar_detected_count = 0
+        self.vote = MarkerVote((self.target_ar_id1, self.target_ar_id2), self.vote_window,
+                               self.counting_to_need, self.vote_margin, self.distance_from_ar)
+        self.ar_id = None # 결정된 마커 ID
+        self.marker_ids = np.zeros(8, dtype=np.int64) # 한 프레임의 마커 id/거리 (미리 할당)
+        self.marker_distances = np.zeros(8)
 
-        rate = rospy.Rate(8) # 10hz
-        ################ main ###################
-        while not rospy.is_shutdown():
-            if self.is_ar_markers:
-                if self.check_AR():
-                    if self.ar_id == self.target_ar_id1:
-                        self.switch_data.data = 0
-                        self.lane_switch.publish(self.switch_data)
-                        rospy.loginfo(f"check_AR: left lane gogo")
+        # 파라미터 설정 후 구독, 모든 메시지를 콜백에서 바로 처리
+        rospy.Subscriber('/ar_pose_marker', AlvarMarkers, self.ar_callback, queue_size=1)
 
-                        self.parking_msg.data = True
-                        self.parking_pub.publish(self.parking_msg)
+        ################ main ###################
+        rospy.spin()
 
-                    elif self.ar_id == self.target_ar_id2:
-                        self.switch_data.data = 1
-                        self.lane_switch.publish(self.switch_data)
-                        rospy.loginfo(f"check_AR: right lane gogo")
-                        
-                        self.parking_msg.data = True
-                        self.parking_pub.publish(self.parking_msg)
+    @instrument.timed('choice_AB.ar_callback')
+    def ar_callback(self, data):
+        if self.ar_id is not None: # 이미 결정됨
+            return
 
-            self.is_ar_markers = False
-            rate.sleep()
+        count = len(data.markers)
+        if count > len(self.marker_ids):
+            self.marker_ids = np.zeros(2 * count, dtype=np.int64)
+            self.marker_distances = np.zeros(2 * count)
+        for i, marker in enumerate(data.markers):
+            self.marker_ids[i] = marker.id
+            self.marker_distances[i] = marker.pose.pose.position.z
 
-    def ar_callback(self, data):
-        self.is_ar_markers = True
-        self.ar_markers = data.markers
+        decision = self.vote.update(self.marker_ids[:count], self.marker_distances[:count])
+        if decision is None:
+            return
+        self.ar_id = decision
 
-    def check_AR(self):
-        if len(self.ar_markers) == 1:
-            ar_marker = self.ar_markers[0]
-            if self.ar_id == None:
-                self.ar_id = ar_marker.id
-            else:
-                if self.ar_id != ar_marker.id:
-                    self.ar_id = ar_marker.id
-                    self.ar_detected_count = 0
-                    return False
-            if self.ar_detected(ar_marker.pose.pose.position.z):
-                return True
-            else:
-                return False
+        # 결정 당시 최근 vote_window 프레임 중 A/B 마커가 보인 비율도 같이 기록
+        confidence_a, confidence_b = self.vote.confidence().tolist()
+        if self.ar_id == self.target_ar_id1:
+            self.switch_data.data = 0
+            logger.info("check_AR: left lane gogo (A %.2f, B %.2f)", confidence_a, confidence_b)
         else:
-            return False
+            self.switch_data.data = 1
+            logger.info("check_AR: right lane gogo (A %.2f, B %.2f)", confidence_a, confidence_b)
+        self.lane_switch.publish(self.switch_data)
+        instrument.record_age('choice_AB.input_age', rospy.get_time(), data.header.stamp.to_sec())
 
-    def ar_detected(self,distance):
-        if distance <= self.distance_from_ar:
-            self.ar_detected_count += 1
-            if self.ar_detected_count >= self.counting_to_need:
-                return True
-            else:
-                return False
-        else:
-            self.ar_detected_count = 0
-            return False
+        self.parking_msg.data = True
+        self.parking_pub.publish(self.parking_msg)
 
 if __name__ == '__main__':
     try:
         Choice_AB = AR()
     except rospy.ROSInterruptException:
-        rospy.loginfo("Choice_AB node terminated.")
\ No newline at end of file
+        rospy.loginfo("Choice_AB node terminated.")
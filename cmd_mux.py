@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 우선순위 기반 제어 명령 선택 (ackermann_cmd_mux 대체)
+# - 명령이 들어오면 그 자리에서 내보낼지 결정 (주기 대기 없음)
+# - 현재 활성 입력보다 우선순위가 같거나 높으면 바로 교체, 낮으면 활성 입력이 타임아웃된 경우에만 교체
+# - 활성 입력이 타임아웃되면 아직 유효한 입력 중 우선순위가 가장 높은 입력으로 교체 (정지 명령 없음)
+# - 모든 입력이 타임아웃이면 활성 입력 없음 -> 워치독이 정지 명령을 냄
+
+import threading
+
+
+class MuxInput:
+    def __init__(self, topic, priority, timeout):
+        self.topic = topic
+        self.priority = priority
+        self.timeout = timeout
+        self.last_time = None
+        self.count = 0  # 받은 명령 수
+        self.forwarded = 0  # 출력으로 내보낸 명령 수
+        self.latency_sum = 0.0  # 수신 -> 발행 지연 합 [s]
+        self.latency_max = 0.0
+
+    def fresh(self, now):
+        return self.last_time is not None and now - self.last_time <= self.timeout
+
+
+class CommandMux:
+    def __init__(self, inputs):
+        # inputs: [(토픽, 우선순위, 타임아웃[s])], 우선순위는 클수록 높음
+        self.inputs = {topic: MuxInput(topic, priority, timeout) for topic, priority, timeout in inputs}
+        self.active = None
+        self.lock = threading.Lock()
+
+    def select(self, topic, now):
+        # topic에서 명령이 들어왔을 때 이 명령을 내보내야 하면 True
+        with self.lock:
+            source = self.inputs[topic]
+            source.last_time = now
+            source.count += 1
+            current = self.active
+            if current is None or current is source or source.priority >= current.priority or not current.fresh(now):
+                self.active = source
+                source.forwarded += 1
+                return True
+            return False
+
+    def all_stale(self, now):
+        with self.lock:
+            if self.active is None or not self.active.fresh(now):
+                fresh = [source for source in self.inputs.values() if source.fresh(now)]
+                self.active = max(fresh, key=lambda source: source.priority) if fresh else None
+            return self.active is None
+
+    def record_latency(self, topic, latency):
+        source = self.inputs[topic]
+        source.latency_sum += latency
+        source.latency_max = max(source.latency_max, latency)
+
+    def report(self, period):
+        # 입력별 (토픽, 수신 Hz, 발행 수, 평균 지연, 최대 지연) 후 카운터 초기화
+        rows = []
+        with self.lock:
+            for source in self.inputs.values():
+                forwarded = max(source.forwarded, 1)
+                rows.append((source.topic, source.count / period, source.forwarded,
+                             source.latency_sum / forwarded, source.latency_max))
+                source.count = 0
+                source.forwarded = 0
+                source.latency_sum = 0.0
+                source.latency_max = 0.0
+        return rows
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 프레임 사이에 유지되는 러버콘 지도
+# - 콘은 고정된 "지도 좌표"로 저장하고, 차량 자세(회전 theta + 이동 t)를 프레임마다 추정
+#     차량 좌표 = R(theta) @ 지도 좌표 + t
+#   -> 차량이 돌아도 지도의 콘은 그대로이고, 콘을 다시 격자에 넣지 않아도 됨
+# - 자세 추정: 이전 프레임의 자세 변화량(등속 가정)으로 예측 -> 새 검출을 기존 콘과 연결 ->
+#   연결된 쌍으로 2D 강체 변환(Kabsch)을 구해서 보정 (보정한 자세로 한 번 더 연결/보정)
+#   추적이 끊긴 상태(연결 2개 미만)에서는 속도 x 시간만큼 직진했다고 예측
+# - 새 검출은 공간 해시 격자(주변 3x3 셀)로 기존 콘과 연결하고 위치를 조금씩 갱신
+# - 왼쪽/오른쪽 라벨은 한 번 정해지면 유지, 새 콘은 바로 뒤(차량 기준 x가 더 큰 쪽)에 있는 라벨 콘을 따라감
+#   라벨마다 뒤 -> 앞 순서의 콘 목록(chains)을 유지해서 라인을 만들 때 정렬하지 않음
+# - 차량 뒤로 지나간 콘과 오래 안 보인 콘은 제거
+# - 프레임당 계산은 검출 수와 살아 있는 콘 수(최근 max_missed 프레임에 보인 콘)에 비례 (지도 용량과 무관)
+
+import numpy as np
+from math import atan2, cos, sin, pi
+
+UNKNOWN, LEFT, RIGHT = 0, 1, 2
+
+
+def rotation(theta):
+    c, s = cos(theta), sin(theta)
+    return np.array([[c, -s], [s, c]])
+
+
+def fit_rigid(source, target):
+    # target ≈ R(theta) @ source + t 인 (theta, t) (최소제곱, 2D Kabsch)
+    source_center, target_center = source.mean(axis=0), target.mean(axis=0)
+    a, b = source - source_center, target - target_center
+    theta = atan2(np.sum(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]), np.sum(a[:, 0] * b[:, 0] + a[:, 1] * b[:, 1]))
+    return theta, target_center - rotation(theta) @ source_center
+
+
+class ConeMap:
+    def __init__(self, planner, gate=0.12, alpha=0.5, max_missed=5, behind_x=0.5, capacity=256, period=0.1):
+        self.planner = planner  # 첫 콘 선택 규칙과 distance_between_rubber_cone을 그대로 사용
+        self.gate = gate  # 이 거리 안의 기존 콘과 같은 콘으로 봄
+        self.alpha = alpha  # 위치 갱신 비율 (새 검출 쪽)
+        self.max_missed = max_missed  # 연속으로 이만큼 안 보이면 제거
+        self.behind_x = behind_x  # 차량 기준 x가 이보다 크면 (뒤로 지나가면) 제거
+        self.period = period  # stamp가 없을 때 프레임 간격 [s]
+        self.cell_size = max(gate, planner.distance_between_rubber_cone)
+
+        self.xy = np.zeros((capacity, 2))  # 지도 좌표
+        self.label = np.zeros(capacity, dtype=np.int8)
+        self.missed = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.alive = set()  # 살아 있는 콘 번호
+        self.grid = {}  # 셀 -> 콘 번호 리스트
+        self.chains = {LEFT: [], RIGHT: []}  # 라벨 -> 콘 번호 (뒤 -> 앞 순서)
+
+        self.theta = 0.0  # 차량 좌표 = R(theta) @ 지도 좌표 + t
+        self.t = np.zeros(2)
+        self.delta = (0.0, np.zeros(2), period)  # 직전 프레임의 자세 변화량 (dtheta, dt 벡터, 프레임 간격)
+        self.tracking = False  # 직전 프레임에서 자세를 추정했는지
+        self.last_stamp = None
+
+    def to_map(self, points, theta=None, t=None):
+        theta = self.theta if theta is None else theta
+        t = self.t if t is None else t
+        return (points - t) @ rotation(theta)  # R^T (p - t)
+
+    def to_vehicle(self, points):
+        return points @ rotation(self.theta).T + self.t
+
+    def cell(self, point):
+        return (int(np.floor(point[0] / self.cell_size)), int(np.floor(point[1] / self.cell_size)))
+
+    def nearby(self, point):
+        kx, ky = self.cell(point)
+        for x in (kx - 1, kx, kx + 1):
+            for y in (ky - 1, ky, ky + 1):
+                for cone in self.grid.get((x, y), ()):
+                    yield cone
+
+    def add(self, point):
+        if not self.free:
+            self.grow()
+        cone = self.free.pop()
+        self.xy[cone] = point
+        self.label[cone] = UNKNOWN
+        self.missed[cone] = 0
+        self.active[cone] = True
+        self.alive.add(cone)
+        self.grid.setdefault(self.cell(point), []).append(cone)
+        return cone
+
+    def move(self, cone, point):
+        old_cell, new_cell = self.cell(self.xy[cone]), self.cell(point)
+        self.xy[cone] = point
+        if old_cell != new_cell:
+            self.grid[old_cell].remove(cone)
+            if not self.grid[old_cell]:
+                del self.grid[old_cell]
+            self.grid.setdefault(new_cell, []).append(cone)
+
+    def remove(self, cone):
+        cell = self.cell(self.xy[cone])
+        self.grid[cell].remove(cone)
+        if not self.grid[cell]:
+            del self.grid[cell]
+        if self.label[cone] != UNKNOWN:
+            self.chains[self.label[cone]].remove(cone)
+        self.active[cone] = False
+        self.alive.discard(cone)
+        self.free.append(cone)
+
+    def grow(self):
+        capacity = len(self.xy)
+        self.xy = np.concatenate((self.xy, np.zeros((capacity, 2))))
+        self.label = np.concatenate((self.label, np.zeros(capacity, dtype=np.int8)))
+        self.missed = np.concatenate((self.missed, np.zeros(capacity, dtype=np.int64)))
+        self.active = np.concatenate((self.active, np.zeros(capacity, dtype=bool)))
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def associate(self, detections):
+        # 각 검출에 대해 gate 안에서 가장 가까운 (이번 프레임에 아직 안 쓴) 기존 콘
+        matches = np.full(len(detections), -1, dtype=np.int64)
+        used = set()
+        for i, point in enumerate(detections):
+            best, best_distance = -1, self.gate
+            for cone in self.nearby(point):
+                if cone in used:
+                    continue
+                distance = np.hypot(self.xy[cone, 0] - point[0], self.xy[cone, 1] - point[1])
+                if distance <= best_distance:
+                    best, best_distance = cone, distance
+            if best >= 0:
+                used.add(best)
+                matches[i] = best
+        return matches
+
+    def predict(self, dt, speed):
+        # 이번 프레임의 자세 예측
+        if self.tracking:
+            d_theta, d_t, last_dt = self.delta
+            scale = dt / last_dt
+            d_theta, d_t = d_theta * scale, d_t * scale
+        else:
+            # 전방(-x)으로 speed만큼 움직이면 콘은 차량 기준 +x로 이동
+            d_theta, d_t = 0.0, np.array([(speed or 0.0) * dt, 0.0])
+        return self.theta + d_theta, rotation(d_theta) @ self.t + d_t
+
+    def update(self, points, stamp=None, speed=None):
+        # points: 차량 좌표 (N,2) 검출, stamp: 프레임 시각 [s], speed: 차량 속도 [m/s] (추적이 끊겼을 때 예측에 사용)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        dt = self.period if stamp is None or self.last_stamp is None else max(stamp - self.last_stamp, 1e-3)
+        self.last_stamp = stamp
+
+        # 예측한 자세에서 연결 -> 연결된 쌍으로 자세 보정 (두 번)
+        theta, t = self.predict(dt, speed)
+        matches = np.full(len(points), -1, dtype=np.int64)
+        for _ in range(2):
+            matches = self.associate(self.to_map(points, theta, t))
+            matched = np.flatnonzero(matches >= 0)
+            if matched.size >= 2:
+                theta, t = fit_rigid(self.xy[matches[matched]], points[matched])
+            elif matched.size == 1:
+                t = points[matched[0]] - rotation(theta) @ self.xy[matches[matched[0]]]
+            else:
+                break
+        matched = matches >= 0
+
+        self.tracking = np.count_nonzero(matched) >= 2
+        if self.tracking:
+            d_theta = (theta - self.theta + pi) % (2 * pi) - pi  # fit_rigid의 theta는 (-pi, pi]라서 ±pi를 넘을 때 2pi 점프 제거
+            self.delta = (d_theta, t - rotation(d_theta) @ self.t, dt)
+        self.theta, self.t = theta, t
+        detections = self.to_map(points)
+
+        # 연결된 콘 위치 갱신
+        for i in np.flatnonzero(matched).tolist():
+            cone = matches[i]
+            self.move(cone, (1 - self.alpha) * self.xy[cone] + self.alpha * detections[i])
+
+        # 안 보인 콘 / 뒤로 지나간 콘 제거 (살아 있는 콘만 확인)
+        seen = matches[matched]
+        self.missed[seen] = -1  # 아래에서 모두 1씩 더하므로 이번에 보인 콘은 0
+        cones = np.fromiter(self.alive, dtype=np.int64, count=len(self.alive))
+        self.missed[cones] += 1
+        vehicle_x = self.to_vehicle(self.xy[cones])[:, 0]
+        for cone in cones[(self.missed[cones] > self.max_missed) | (vehicle_x > self.behind_x)].tolist():
+            self.remove(cone)
+
+        # 새 콘 추가 후 라벨 지정
+        unlabeled = [cone for cone in seen.tolist() if self.active[cone] and self.label[cone] == UNKNOWN]
+        unlabeled += [self.add(detections[i]) for i in np.flatnonzero(~matched).tolist()]
+        self.assign_labels(unlabeled)
+
+    def assign_labels(self, cones):
+        # 바로 뒤쪽(차량 기준 x가 더 큰) max_gap 안의 가장 가까운 라벨 콘을 따라감 (뒤쪽 콘부터 처리해서 앞으로 전파)
+        if not cones:
+            return
+        max_gap = self.planner.distance_between_rubber_cone
+        for side in (LEFT, RIGHT):
+            if not self.chains[side]:
+                self.seed(side, cones)
+
+        cones = np.asarray(cones, dtype=np.int64)
+        vehicle_x = self.to_vehicle(self.xy[cones])[:, 0]
+        for cone in cones[np.argsort(-vehicle_x, kind='stable')].tolist():
+            if self.label[cone] != UNKNOWN:
+                continue
+            cone_x = self.to_vehicle(self.xy[cone])[0]
+            best, best_distance = -1, max_gap
+            for other in self.nearby(self.xy[cone]):
+                if self.label[other] == UNKNOWN or self.to_vehicle(self.xy[other])[0] <= cone_x:
+                    continue
+                distance = np.hypot(*(self.xy[other] - self.xy[cone]))
+                if distance <= best_distance:
+                    best, best_distance = other, distance
+            if best >= 0:
+                side = self.label[best]
+                self.label[cone] = side
+                chain = self.chains[side]
+                chain.insert(chain.index(best) + 1, cone)
+
+    def seed(self, side, cones):
+        # 한쪽 라인이 비어 있으면 이번 프레임의 라벨 없는 콘 중에서 ConePlanner와 같은 규칙으로 첫 콘을 정함
+        cones = np.asarray([cone for cone in cones if self.label[cone] == UNKNOWN], dtype=np.int64)
+        if cones.size == 0:
+            return
+        points = self.to_vehicle(self.xy[cones])
+        norms = np.linalg.norm(points, axis=1)
+        angles = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+        if side == LEFT:
+            first = self.planner.first_cone(points, norms, points[:, 1] < 0, angles > -135,
+                                            self.planner.distance_from_left_first_rubber_cone)
+        else:
+            first = self.planner.first_cone(points, norms, points[:, 1] > 0, angles < 135,
+                                            self.planner.distance_from_right_first_rubber_cone)
+        if first >= 0:
+            self.label[cones[first]] = side
+            self.chains[side].append(int(cones[first]))
+
+    def lines(self):
+        # 차량 좌표의 (왼쪽 라인, 오른쪽 라인), 각각 뒤 -> 앞 순서 (chain_line과 같은 순서)
+        # 라인은 ConePlanner와 같은 규칙으로 고른 첫 콘부터 시작 (그보다 뒤에 남아 있는 콘은 제외)
+        result = []
+        for side, angle_limit, max_distance in ((LEFT, -135, self.planner.distance_from_left_first_rubber_cone),
+                                                (RIGHT, 135, self.planner.distance_from_right_first_rubber_cone)):
+            chain = self.chains[side]
+            if not chain:
+                result.append(np.empty((0, 2)))
+                continue
+            points = self.to_vehicle(self.xy[chain])
+            norms = np.linalg.norm(points, axis=1)
+            angles = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+            angle_mask = angles > angle_limit if side == LEFT else angles < angle_limit
+            first = self.planner.first_cone(points, norms, np.ones(len(points), dtype=bool), angle_mask, max_distance)
+            result.append(points[first:] if first >= 0 else np.empty((0, 2)))
+        return result[0], result[1]
+
+
+if __name__ == '__main__':
+    # 폐루프 회귀 확인: 곡선 트랙 1.4m/s에서 콘 지도를 쓰면 매 프레임 새로 계획할 때보다 충돌이 많으면 실패 (종료 코드 1)
+    # + 원형 통로를 두 바퀴 (누적 회전이 ±pi를 여러 번 넘음, stamp 흔들림 ±20ms)에서 자세 오차나 콘 중복이 크면 실패
+    import sys
+    import sim
+    from cone_planner import ConePlanner
+
+    config = dict(length=15.0, spacing=0.25, noise=0.01, dropout=0.1, width=0.8, curvature=0.6)
+    seeds = 8
+    collision_rate = {}
+    for use_cone_map in (False, True):
+        results = sim.run_grid('rubber_cone', [{'use_cone_map': use_cone_map, 'speed': 1.4}], seeds, config)
+        collision_rate[use_cone_map] = np.mean([r['collisions'] > 0 for r in results])
+        print(f"use_cone_map={use_cone_map}: collision rate {collision_rate[use_cone_map]:.2f}, "
+              f"completion rate {np.mean([r['completed'] for r in results]):.2f}, "
+              f"cte mean {np.mean([r['cte_mean'] for r in results]):.3f}m")
+
+    radius, speed = 2.0, 1.0
+    cones = np.concatenate([np.column_stack((r * np.cos(a), r * np.sin(a)))
+                            for r in (radius - 0.4, radius + 0.4) for a in [np.arange(0, 2 * pi, config['spacing'] / r)]])
+    rng = np.random.default_rng(0)
+    cone_map = ConeMap(ConePlanner(), gate=0.12, alpha=0.5, max_missed=5, behind_x=0.5)
+    heading_error, duplicate_ratio = 0.0, 0.0
+    for seq in range(int(2 * 2 * pi * radius / speed / sim.DT)):
+        stamp = seq * sim.DT + rng.uniform(-0.02, 0.02)
+        phi = speed * stamp / radius  # 원 위의 차량 위치 각도 (반시계), 차량 yaw = phi + pi/2
+        local = sim.Bicycle(radius * np.cos(phi), radius * np.sin(phi), phi + pi / 2).to_lidar(cones)
+        local = local[np.hypot(local[:, 0], local[:, 1]) < sim.OBSTACLE_RANGE]
+        local = local + rng.normal(0, config['noise'], local.shape)
+        cone_map.update(local, stamp, speed)
+        if seq >= 5:
+            # 지도 좌표 = 첫 프레임의 라이다 좌표이므로 theta ≈ -(yaw 변화량)
+            heading_error = max(heading_error, abs((cone_map.theta + phi + pi) % (2 * pi) - pi))
+            duplicate_ratio = max(duplicate_ratio, len(cone_map.alive) / max(len(local), 1))
+    print(f"circle: max heading error {heading_error:.3f}rad, max live cones / detections {duplicate_ratio:.2f}")
+    sys.exit(1 if collision_rate[True] > collision_rate[False] or heading_error > 0.2 or duplicate_ratio > 1.5 else 0)
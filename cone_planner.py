@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 러버콘 경로 계획 코어 (ROS 없이 사용 가능)
+
+import numpy as np
+from math import sin, sqrt, atan2
+
+
+class ConeIndex:
+    # Obstacles 메시지 1개당 한 번 만드는 이웃 그래프
+    # 셀 크기가 max_gap인 격자에서 주변 3x3 셀만 비교해서 포인트마다 다음 콘을 미리 구해 둠 (O(n log n))
+    def __init__(self, points, max_gap):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.max_gap = max_gap
+        n = len(self.points)
+        self.successor = np.full(n, -1, dtype=np.int64)
+        if n == 0:
+            return
+
+        # 격자 셀 번호 (주변 셀 번호가 겹치지 않도록 한 칸씩 여유)
+        keys = np.floor(self.points / max_gap).astype(np.int64)
+        keys -= keys.min(axis=0)
+        width = int(keys[:, 1].max()) + 3
+        cell = (keys[:, 0] + 1) * width + (keys[:, 1] + 1)
+        order = np.argsort(cell, kind='stable')
+        sorted_cell = cell[order]
+
+        # 주변 9개 셀에 있는 (현재 포인트, 후보 포인트) 쌍 만들기
+        src_list, dst_list = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                target = cell + dx * width + dy
+                lo = np.searchsorted(sorted_cell, target, side='left')
+                hi = np.searchsorted(sorted_cell, target, side='right')
+                counts = hi - lo
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                src_list.append(np.repeat(np.arange(n), counts))
+                dst_list.append(order[np.repeat(lo, counts) + offsets])
+        src = np.concatenate(src_list)
+        dst = np.concatenate(dst_list)
+
+        # add_line_points 규칙: x가 더 작고(전방) 거리 max_gap 이내
+        mask = (self.points[dst, 0] < self.points[src, 0]) & (np.linalg.norm(self.points[dst] - self.points[src], axis=1) <= max_gap)
+        src, dst = src[mask], dst[mask]
+        if src.size == 0:
+            return
+
+        # 후보 중 원점에서 가장 가까운 포인트 (거리가 같으면 먼저 들어온 포인트 -> 기존 argmin과 같은 결과)
+        norms = np.linalg.norm(self.points, axis=1)
+        order = np.lexsort((dst, norms[dst], src))
+        src, dst = src[order], dst[order]
+        first = np.ones(src.size, dtype=bool)
+        first[1:] = src[1:] != src[:-1]
+        self.successor[src[first]] = dst[first]
+
+
+def chain_line(cone_index, start_index):
+    # start_index부터 이어지는 콘 라인의 인덱스 (시작점 포함)
+    # x가 계속 줄어들기 때문에 순환 없이 끝남
+    # 라인을 따라가는 부분만 순차 반복 (이웃 그래프는 ConeIndex에서 배열 연산으로 구함)
+    # pointer doubling으로 배열 연산만 쓰면 콘 수 n 전체에 log2(라인 길이)번 연산이 필요해서
+    # 콘 20~1000개에서 5~40배 느림 (numpy 호출 비용 > 라인 길이만큼의 파이썬 반복)
+    successor = cone_index.successor.tolist()
+    line = [start_index]
+    next_index = successor[start_index]
+    while next_index >= 0:
+        line.append(next_index)
+        next_index = successor[next_index]
+    return np.array(line, dtype=np.int64)
+
+
+def center_line_from(left_line, right_line):
+    # 왼쪽/오른쪽 라인 (각각 (n,2) 배열)으로 중앙선 계산
+    left_size, right_size = len(left_line), len(right_line)
+
+    if left_size > 0 and right_size > 0:
+        # 짧은 쪽 길이까지는 양쪽 평균, 나머지는 긴 쪽 라인을 마지막 간격만큼 평행 이동
+        size = min(left_size, right_size)
+        longer = left_line if left_size >= right_size else right_line
+        center_line = np.empty((max(left_size, right_size), 2))
+        center_line[:size] = (left_line[:size] + right_line[:size]) / 2
+        center_line[size:] = longer[size:] + (center_line[size - 1] - longer[size - 1])
+        return center_line
+
+    # 한쪽 라인만 있으면 첫 콘이 원점에 오도록 평행 이동
+    if left_size > 0:
+        return left_line - left_line[0]
+    if right_size > 0:
+        return right_line - right_line[0]
+    return np.empty((0, 2))
+
+
+class ArcPath:
+    # 차량(원점)에서 시작해 전방(x < 0) 중앙선 포인트를 x 내림차순으로 이은 경로를
+    # 누적 호 길이 기준 step 간격으로 다시 샘플링 (배열은 미리 할당해서 재사용)
+    # 샘플 간격이 일정해서 look ahead 지점은 인덱스 계산 + 선형 보간으로 바로 구함
+    def __init__(self, step=0.05, capacity=256):
+        self.step = step
+        self.grid = np.arange(capacity) * step  # 샘플별 호 길이
+        self.xy = np.zeros((capacity, 2))
+        self.size = 0
+        self.length = 0.0
+        self.end_direction = np.zeros(2)  # 경로 끝 방향 (경로보다 먼 지점은 이 방향으로 연장)
+
+    def build(self, center_line):
+        ahead = center_line[center_line[:, 0] < 0]
+        if len(ahead) == 0:
+            self.size = 0
+            self.length = 0.0
+            return self
+        vertices = np.empty((len(ahead) + 1, 2))
+        vertices[0] = 0.0
+        vertices[1:] = ahead[np.argsort(-ahead[:, 0], kind='stable')]
+
+        # 꼭짓점별 누적 호 길이 -> 일정 간격 샘플 위치는 이진 탐색(np.interp)으로 보간
+        segment = np.diff(vertices, axis=0)
+        segment_length = np.sqrt(segment[:, 0] ** 2 + segment[:, 1] ** 2)
+        cumulative = np.concatenate(([0.0], np.cumsum(segment_length)))
+        self.length = float(cumulative[-1])
+        size = int(self.length / self.step) + 1
+        if size > len(self.grid):
+            self.grid = np.arange(max(size, 2 * len(self.grid))) * self.step
+            self.xy = np.zeros((len(self.grid), 2))
+        self.xy[:size, 0] = np.interp(self.grid[:size], cumulative, vertices[:, 0])
+        self.xy[:size, 1] = np.interp(self.grid[:size], cumulative, vertices[:, 1])
+        self.size = size
+
+        last = np.flatnonzero(segment_length > 0)
+        self.end_direction = segment[last[-1]] / segment_length[last[-1]] if last.size else np.zeros(2)
+        return self
+
+    def point_at(self, distance):
+        # 호 길이 distance 지점 (경로보다 멀면 끝 방향으로 연장), 경로가 없으면 None
+        if self.size == 0:
+            return None
+        if distance >= self.length:
+            return self.xy[self.size - 1] + (distance - self.grid[self.size - 1]) * self.end_direction
+        position = distance / self.step
+        i = min(int(position), self.size - 2)
+        if i < 0:
+            return self.xy[0]
+        t = position - i
+        return self.xy[i] * (1 - t) + self.xy[i + 1] * t
+
+
+class ConeFeatures:
+    # 프레임당 한 번 계산하는 콘 특징 (미션 시작/진행 판단과 경로 계획이 같이 사용)
+    # rois: {이름: (x_min, x_max, y_min, y_max)}, 경계는 포함하지 않음 -> counts[이름] = 영역 안의 콘 수
+    def __init__(self, points, rois=None, max_gap=None):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y = self.points[:, 0], self.points[:, 1]
+        self.norms = np.sqrt(x * x + y * y)  # 라이다 기준 거리 (np.linalg.norm과 같은 값)
+        self.angles = np.degrees(np.arctan2(y, x))
+        self.left = y < 0  # 라이다가 뒤집혀 있어서 y < 0이 차량 왼쪽
+        self.right = y > 0
+        self.counts = {}
+        for name, (x_min, x_max, y_min, y_max) in (rois or {}).items():
+            self.counts[name] = int(np.count_nonzero((x_min < x) & (x < x_max) & (y_min < y) & (y < y_max)))
+        # max_gap이 있으면 이웃 그래프도 같이 생성 (planner에서 재사용)
+        self.cone_index = ConeIndex(self.points, max_gap) if max_gap is not None else None
+
+
+class ConePlanner:
+    # Rubber_cone.rubber_cone의 경로 계획 부분 (입력: (N,2) 콘 좌표, 출력: 조향각)
+    # lookahead_mode
+    #   'legacy': x 내림차순 중앙선에서 원점 거리 lfd 이상인 첫 포인트 (없으면 마지막 포인트), 첫 포인트와 합한 방향으로 조향
+    #   'arc': ArcPath에서 호 길이 lfd 지점, lfd = clip(lfd_gain * 속도, lfd, lfd_max)
+    def __init__(self, lfd=0.6, vehicle_length=0.26, distance_from_left_first_rubber_cone=1.0,
+                 distance_from_right_first_rubber_cone=1.0, distance_between_rubber_cone=0.3,
+                 lookahead_mode='legacy', lfd_gain=1.0, lfd_max=1.5, path_step=0.05):
+        self.lfd = lfd
+        self.vehicle_length = vehicle_length
+        self.distance_from_left_first_rubber_cone = distance_from_left_first_rubber_cone
+        self.distance_from_right_first_rubber_cone = distance_from_right_first_rubber_cone
+        self.distance_between_rubber_cone = distance_between_rubber_cone
+        self.lookahead_mode = lookahead_mode
+        self.lfd_gain = lfd_gain
+        self.lfd_max = lfd_max
+        self.path = ArcPath(path_step)
+
+    def lookahead_distance(self, speed=None):
+        if speed is None:
+            return self.lfd
+        return min(max(self.lfd_gain * speed, self.lfd), self.lfd_max)
+
+    def first_cone(self, points, norms, side_mask, angle_mask, max_distance):
+        # 각도 조건을 만족하는 가장 가까운 콘 (없으면 해당 쪽에서 가장 가까운 콘)
+        candidates = np.flatnonzero(side_mask & angle_mask)
+        if candidates.size == 0:
+            candidates = np.flatnonzero(side_mask)
+            if candidates.size == 0:
+                return -1
+        first_index = candidates[np.argmin(norms[candidates])]
+        if norms[first_index] < max_distance:
+            return int(first_index)
+        return -1
+
+    def lines(self, points, cone_index=None, features=None):
+        # features(ConeFeatures)가 있으면 거리/각도/좌우 구분과 이웃 그래프를 다시 계산하지 않음
+        if features is None:
+            features = ConeFeatures(points)
+        points = features.points
+        if cone_index is None:
+            cone_index = features.cone_index
+        if cone_index is None:
+            cone_index = ConeIndex(points, self.distance_between_rubber_cone)
+
+        norms, angles = features.norms, features.angles
+        left_index = self.first_cone(points, norms, features.left, angles > -135, self.distance_from_left_first_rubber_cone)
+        right_index = self.first_cone(points, norms, features.right, angles < 135, self.distance_from_right_first_rubber_cone)
+
+        empty = np.empty((0, 2))
+        left_line = points[chain_line(cone_index, left_index)] if left_index >= 0 else empty
+        right_line = points[chain_line(cone_index, right_index)] if right_index >= 0 else empty
+        return left_line, right_line
+
+    def steering(self, center_line, speed=None):
+        if len(center_line) == 0:
+            return 0.0
+        if self.lookahead_mode == 'arc':
+            return self.arc_steering(center_line, speed)
+
+        # x 내림차순 정렬 (sorted(..., reverse=True)와 같은 순서)
+        sorted_center_line = center_line[np.argsort(-center_line[:, 0], kind='stable')]
+        first_point = sorted_center_line[0]
+
+        # lfd 이상 떨어진 첫 포인트, 없으면 마지막 포인트
+        far = np.flatnonzero(np.sqrt(sorted_center_line[:, 0] ** 2 + sorted_center_line[:, 1] ** 2) >= self.lfd)
+        point = sorted_center_line[far[0]] if far.size > 0 else sorted_center_line[-1]
+
+        theta = atan2(point[1] + first_point[1], point[0] + first_point[0])
+        return -atan2(2 * self.vehicle_length * sin(theta), self.lfd)
+
+    def arc_steering(self, center_line, speed=None):
+        # pure pursuit: 차량 좌표 (전방 = -x, 왼쪽 = -y)로 바꿔서 look ahead 지점까지의 원호 곡률
+        point = self.path.build(center_line).point_at(self.lookahead_distance(speed))
+        if point is None:
+            return 0.0
+        forward, left = -point[0], -point[1]
+        distance = sqrt(forward * forward + left * left)
+        if distance == 0:
+            return 0.0
+        return atan2(2 * self.vehicle_length * left / distance, distance)
+
+    def plan(self, points, cone_index=None, features=None, speed=None):
+        left_line, right_line = self.lines(points, cone_index, features)
+        return self.steering(center_line_from(left_line, right_line), speed)
+
+    def plan_batch(self, points, offsets=None, speed=None):
+        # 여러 프레임을 한 번에 계획 (편의용: 프레임마다 plan을 부르는 반복문, 프레임 사이를 묶어서 벡터화하지는 않음)
+        # 프레임마다 콘 수와 라인 길이가 달라서 배열 연산은 프레임 안(ConeIndex, 중앙선, 경로)에서만 사용
+        # offsets가 있으면 points는 모든 프레임을 이어 붙인 (M,2) 배열, 프레임 i = points[offsets[i]:offsets[i+1]]
+        # offsets가 없으면 points는 프레임별 (N_i,2) 배열의 리스트
+        # speed: 모든 프레임에 같은 속도 (스칼라) 또는 프레임별 속도 배열 (arc 모드 lfd 계산, 노드와 같은 결과)
+        # 콘이 없는 프레임은 조향각을 내보내지 않으므로 nan
+        if offsets is None:
+            frames = points
+        else:
+            points = np.asarray(points, dtype=float).reshape(-1, 2)
+            frames = np.split(points, np.asarray(offsets)[1:-1])
+        if speed is None or np.ndim(speed) == 0:
+            speeds = [speed] * len(frames)
+        else:
+            speeds = np.asarray(speed, dtype=float)
+            if len(speeds) != len(frames):
+                raise ValueError(f"speed has {len(speeds)} values for {len(frames)} frames")
+            speeds = speeds.tolist()
+
+        steering = np.full(len(frames), np.nan)
+        for i, frame in enumerate(frames):
+            if len(frame) > 0:
+                steering[i] = self.plan(frame, speed=speeds[i])
+        return steering
+
+
+def chain_line_naive(points, current_point, max_gap):
+    # 기존 Rubber_cone.add_line_points 구현 (O(n^2), 비교/검증용)
+    line = [current_point]
+    next_points = points[(points[:, 0] < current_point[0]) & (np.linalg.norm(points - current_point, axis=1) <= max_gap)]
+    while next_points.size > 0:
+        next_point = next_points[np.argmin(np.linalg.norm(next_points, axis=1))]
+        if np.linalg.norm(next_point - current_point) <= max_gap:
+            line.append(next_point)
+            current_point = next_point
+            next_points = points[(points[:, 0] < current_point[0]) & (np.linalg.norm(points - current_point, axis=1) <= max_gap)]
+        else:
+            break
+    return line
+
+
+def random_cone_scene(n, spacing=0.2, width=0.8, noise=0.01, seed=0):
+    # 직선/곡선 콘 통로 + 잡음 포인트 (전방이 -x 방향)
+    rng = np.random.default_rng(seed)
+    half = max(n // 2, 1)
+    s = np.arange(half) * spacing
+    curve = 0.3 * np.sin(s / 2.0)
+    left = np.column_stack((-s, curve - width / 2))
+    right = np.column_stack((-s, curve + width / 2))
+    points = np.concatenate((left, right))[:n]
+    points = points + rng.normal(0, noise, points.shape)
+    return points[rng.permutation(len(points))]
+
+
+if __name__ == '__main__':
+    import time
+
+    max_gap = 0.3
+    for n in (10, 50, 100, 200, 500, 1000):
+        points = random_cone_scene(n)
+        start_index = int(np.argmin(np.linalg.norm(points, axis=1)))
+        start = points[start_index]
+
+        t0 = time.perf_counter()
+        naive = chain_line_naive(points, start, max_gap)
+        t1 = time.perf_counter()
+        cone_index = ConeIndex(points, max_gap)
+        indexed = chain_line(cone_index, start_index)
+        t2 = time.perf_counter()
+
+        same = np.array_equal(np.array(naive), points[indexed])
+        print(f"n={n:4d} line={len(indexed):4d} naive={(t1 - t0) * 1e3:8.3f}ms grid={(t2 - t1) * 1e3:8.3f}ms same={same}")
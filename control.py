@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import rospy, os
+import rospy, time, threading
+import instrument
+import logger
 from ackermann_msgs.msg import AckermannDriveStamped
 from std_msgs.msg import Float32
+from cmd_mux import CommandMux
+from dashboard import Dashboard
+from snapshot import SnapshotBuffer
 
 class PIDController:
     def __init__(self, kp, ki, kd):
@@ -23,14 +28,38 @@ class PIDController:
 
 
 class control:
-    def __init__(self):
+    def __init__(self, control_mode='relay'):
         ### 노드 초기화 ###
         rospy.init_node('webot_main', anonymous=True)
+        instrument.start_export('control')
+
+        ### 동작 모드 ###
+        # 'relay': nodelet(ackermann_cmd_mux)에서 출력한 제어값을 10Hz로 전달 (기존 방식)
+        # 'mux': 미션 노드 출력(nav_*)을 직접 받아 우선순위로 골라서 바로 전달 (ackermann_cmd_mux 없이 실행)
+        self.control_mode = control_mode # runner.py에서 한 프로세스로 실행할 때는 'mux'
+        self.mux_inputs = [ # (토픽, 우선순위(클수록 높음), 타임아웃[s]), ackermann_cmd_mux 설정과 맞춰서 수정
+            ("high_level/ackermann_cmd_mux/input/nav_1", 1, 0.3), # rubber_cone
+            ("high_level/ackermann_cmd_mux/input/nav_5", 5, 0.3), # tunnel
+        ]
+        self.watchdog_period = 0.05 # 모든 입력이 끊겼는지 확인하는 주기 [s]
+        self.report_period = 5.0 # 입력별 통계 출력 주기 [s]
+        self.dashboard_rate = 2.0 # 상태 화면 갱신 주기 [Hz], 0이면 표시 안 함
+        ####################################
+
+        ### 상태 화면 (별도 스레드에서 출력) ###
+        self.dashboard = Dashboard(f"control ({self.control_mode})", rate=max(self.dashboard_rate, 1e-3))
+        self.dashboard.set("target_input", False)
+        if self.dashboard_rate > 0:
+            self.dashboard.start()
+        ####################################
 
         ### nodelet에서 출력한 제어값 입력받음 ###
-        rospy.Subscriber("/high_level/ackermann_cmd_mux/target_control", AckermannDriveStamped, self.target_callback)
+        if self.control_mode == 'relay':
+            rospy.Subscriber("/high_level/ackermann_cmd_mux/target_control", AckermannDriveStamped, self.target_callback)
         self.is_target_input = False
         self.target_input = None
+        self.command_frames = SnapshotBuffer(1, 2) # relay 모드 콜백 -> 메인 루프: (speed, steering_angle)
+        self.last_seq = 0 # 마지막으로 발행한 프레임 번호
         ####################################
 
         ### 현재 webot 속도 ###
@@ -54,29 +83,93 @@ class control:
         self.pid = PIDController(1.0, 0, 0)
         ####################################
 
+        ### mux 모드 ###
+        if self.control_mode == 'mux':
+            self.mux = CommandMux(self.mux_inputs)
+            self.publish_lock = threading.Lock()
+            self.is_stopped = False
+            self.last_report_time = rospy.get_time()
+            for topic, priority, timeout in self.mux_inputs:
+                rospy.Subscriber(topic, AckermannDriveStamped, self.mux_callback, callback_args=topic, queue_size=1)
+            rospy.Timer(rospy.Duration(self.watchdog_period), self.watchdog_callback)
+            rospy.spin()
+            return
+        ####################################
+
         rate = rospy.Rate(10)  # 10hz
 
         ### main ###
         while not rospy.is_shutdown():
-            os.system('clear')
+            loop_start = time.monotonic()
+            frame = self.command_frames.latest
+            self.is_target_input = frame is not None and frame.seq != self.last_seq # 지난 주기 이후 새 명령이 있으면
+            self.dashboard.set("target_input", self.is_target_input)
             if self.is_target_input: # and self.is_current_speed and self.is_current_angle:
+                self.last_seq = frame.seq
+                self.target_control.drive.speed, self.target_control.drive.steering_angle = frame.values[0].tolist()
                 #self.target_control.drive.steering_angle = self.pid.compute(self.target_input.drive.steering_angle,self.current_angle)
                 self.target_control_pub.publish(self.target_control)
-            else:
-                print("target_input: ", self.is_target_input)
-                # print("current_speed: ", self.is_current_speed)
-                # print("current_angle: ", self.is_current_angle)
+                instrument.record_age('control.input_age', rospy.get_time(), frame.stamp)
+                self.dashboard.set("speed", self.target_control.drive.speed)
+                self.dashboard.set("steering_angle", self.target_control.drive.steering_angle)
+            # self.dashboard.set("current_speed", self.is_current_speed)
+            # self.dashboard.set("current_angle", self.is_current_angle)
 
             self.is_target_input = False
             # self.is_current_speed = False
             # self.is_current_angle = False
+            self.dashboard.loop(loop_start, time.monotonic())
             rate.sleep()
 
+    @instrument.timed('control.target_callback')
     def target_callback(self, data):
-        self.is_target_input = True
-        self.target_input = data
-        self.target_control.drive.speed = data.drive.speed
-        self.target_control.drive.steering_angle = data.drive.steering_angle
+        instrument.record_age('control.receive_age', rospy.get_time(), data.header.stamp.to_sec())
+        self.dashboard.tick("target_control")
+        # 메인 루프가 발행 중인 target_control은 건드리지 않고 스냅샷으로 넘김
+        self.command_frames.begin(1)[0] = (data.drive.speed, data.drive.steering_angle)
+        self.command_frames.commit(1, data.header.stamp.to_sec())
+
+    @instrument.timed('control.mux_callback')
+    def mux_callback(self, data, topic):
+        receive_time = time.perf_counter()
+        instrument.record_age('control.receive_age', rospy.get_time(), data.header.stamp.to_sec())
+        self.dashboard.tick(topic)
+        # 선택된 입력이면 주기를 기다리지 않고 바로 발행
+        if self.mux.select(topic, rospy.get_time()):
+            with self.publish_lock:
+                self.target_input = data
+                self.target_control.header.stamp = rospy.Time.now()
+                self.target_control.drive.speed = data.drive.speed
+                self.target_control.drive.steering_angle = data.drive.steering_angle
+                self.target_control_pub.publish(self.target_control)
+                self.is_stopped = False
+            instrument.record_age('control.input_age', rospy.get_time(), data.header.stamp.to_sec())
+            self.mux.record_latency(topic, time.perf_counter() - receive_time)
+            self.dashboard.set("target_input", topic)
+            self.dashboard.set("speed", data.drive.speed)
+            self.dashboard.set("steering_angle", data.drive.steering_angle)
+
+    def watchdog_callback(self, event):
+        loop_start = time.monotonic()
+        now = rospy.get_time()
+        # 모든 입력이 타임아웃이면 정지 (조향은 마지막 값 유지)
+        if self.mux.all_stale(now):
+            with self.publish_lock:
+                if not self.is_stopped:
+                    logger.warn("control mux: all inputs stale, stopping")
+                self.target_control.header.stamp = rospy.Time.now()
+                self.target_control.drive.speed = 0
+                self.target_control_pub.publish(self.target_control)
+                self.is_stopped = True
+            self.dashboard.set("target_input", False)
+            self.dashboard.set("speed", 0.0)
+
+        if now - self.last_report_time >= self.report_period:
+            for topic, hz, forwarded, latency_avg, latency_max in self.mux.report(now - self.last_report_time):
+                logger.info("control mux %s: %.1fHz, forwarded %d, latency avg %.3fms max %.3fms",
+                            topic, hz, forwarded, latency_avg * 1e3, latency_max * 1e3, key=('control.mux_report', topic))
+            self.last_report_time = now
+        self.dashboard.loop(loop_start, time.monotonic())
 
     def current_speed_callback(self, data):
         self.is_current_speed = True
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 터미널 상태 표시 (os.system('clear') 대체)
+# 제어 루프/콜백은 숫자만 갱신하고, 화면 출력은 별도 스레드가 정해진 주기로 수행
+# 갱신 함수들은 락 없이 값만 바꾸므로 발행 경로를 막지 않음
+
+import sys
+import time
+import threading
+
+CLEAR = '\033[H\033[J'  # 커서를 맨 위로 옮기고 화면 지우기 (셸 실행 없이)
+
+
+class Dashboard(threading.Thread):
+    def __init__(self, title, rate=2.0, stream=None):
+        super().__init__(daemon=True)
+        self.title = title
+        self.period = 1.0 / rate
+        self.stream = stream if stream is not None else sys.stdout
+        self.running = True
+
+        self.topics = {}  # 토픽 -> [받은 수, 마지막 수신 시각]
+        self.values = {}  # 표시할 값
+        self.loop_count = 0
+        self.loop_work = 0.0  # 마지막 루프 처리 시간 [s]
+        self.loop_work_max = 0.0
+        self.loop_period = 0.0  # 마지막 루프 주기 [s]
+        self.last_loop_start = None
+
+        self.previous_counts = {}
+        self.previous_time = time.monotonic()
+
+    def tick(self, topic):
+        entry = self.topics.get(topic)
+        if entry is None:
+            entry = self.topics[topic] = [0, None]
+        entry[0] += 1
+        entry[1] = time.monotonic()
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def loop(self, start, end):
+        # 제어 루프 한 번의 시작/끝 시각 (time.monotonic 기준)
+        if self.last_loop_start is not None:
+            self.loop_period = start - self.last_loop_start
+        self.last_loop_start = start
+        self.loop_work = end - start
+        self.loop_work_max = max(self.loop_work_max, self.loop_work)
+        self.loop_count += 1
+
+    def render(self):
+        now = time.monotonic()
+        elapsed = max(now - self.previous_time, 1e-9)
+        lines = [self.title, '']
+
+        lines.append(f"{'topic':<48}{'rate[Hz]':>10}{'age[ms]':>10}")
+        for topic, (count, last_time) in list(self.topics.items()):
+            rate = (count - self.previous_counts.get(topic, 0)) / elapsed
+            age = f"{(now - last_time) * 1e3:10.0f}" if last_time is not None else f"{'-':>10}"
+            lines.append(f"{topic:<48}{rate:10.1f}{age}")
+            self.previous_counts[topic] = count
+        self.previous_time = now
+
+        lines.append('')
+        for name, value in list(self.values.items()):
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            lines.append(f"{name:<24}{value}")
+
+        if self.loop_count:
+            lines.append('')
+            lines.append(f"{'loop period':<24}{self.loop_period * 1e3:.1f} ms")
+            lines.append(f"{'loop work':<24}{self.loop_work * 1e3:.3f} ms (max {self.loop_work_max * 1e3:.3f} ms)")
+        return '\n'.join(lines)
+
+    def run(self):
+        while self.running:
+            try:
+                self.stream.write(CLEAR + self.render() + '\n')
+                self.stream.flush()
+            except (OSError, ValueError):
+                return
+            time.sleep(self.period)
+
+    def stop(self):
+        self.running = False
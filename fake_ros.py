@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ROS master 없이 노드 로직을 돌리기 위한 rospy 대역 + 메시지 타입
+# install() 후에 rubber_cone / tunnel / choice_AB / control을 import하면 이 모듈이 rospy로 쓰임
+# 시간은 가상 시계(core.now)로 흐르고, Rate.sleep() / spin()이 호출될 때 예약된 메시지를 콜백에 전달함
+
+import sys
+import time
+import copy
+import types
+import heapq
+
+
+########################## 메시지 타입 ##########################
+
+class Time:
+    def __init__(self, secs=0.0):
+        self.secs = float(secs)
+
+    def to_sec(self):
+        return self.secs
+
+    @staticmethod
+    def now():
+        return Time(core.now)
+
+
+class Duration:
+    def __init__(self, secs=0.0):
+        self.secs = float(secs)
+
+    def to_sec(self):
+        return self.secs
+
+
+class Header:
+    def __init__(self, stamp=None, frame_id='', seq=0):
+        self.stamp = stamp if stamp is not None else Time()
+        self.frame_id = frame_id
+        self.seq = seq
+
+
+class Point:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class Quaternion:
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.w = w
+
+
+class Pose:
+    def __init__(self, position=None, orientation=None):
+        self.position = position if position is not None else Point()
+        self.orientation = orientation if orientation is not None else Quaternion()
+
+
+class PoseStamped:
+    def __init__(self, header=None, pose=None):
+        self.header = header if header is not None else Header()
+        self.pose = pose if pose is not None else Pose()
+
+
+class CircleObstacle:  # obstacle_detector/CircleObstacle
+    def __init__(self, center=None, radius=0.0):
+        self.center = center if center is not None else Point()
+        self.velocity = Point()
+        self.radius = radius
+        self.true_radius = radius
+
+
+class Obstacles:  # obstacle_detector/Obstacles
+    def __init__(self, header=None, circles=None):
+        self.header = header if header is not None else Header()
+        self.segments = []
+        self.circles = circles if circles is not None else []
+
+
+class LaserScan:  # sensor_msgs/LaserScan
+    def __init__(self, header=None, angle_min=0.0, angle_max=0.0, angle_increment=0.0,
+                 range_min=0.0, range_max=0.0, ranges=()):
+        self.header = header if header is not None else Header()
+        self.angle_min = angle_min
+        self.angle_max = angle_max
+        self.angle_increment = angle_increment
+        self.time_increment = 0.0
+        self.scan_time = 0.0
+        self.range_min = range_min
+        self.range_max = range_max
+        self.ranges = ranges
+        self.intensities = ()
+
+
+class AlvarMarker:  # ar_track_alvar_msgs/AlvarMarker
+    def __init__(self, id=0, pose=None, header=None):
+        self.header = header if header is not None else Header()
+        self.id = id
+        self.confidence = 0
+        self.pose = pose if pose is not None else PoseStamped()
+
+
+class AlvarMarkers:  # ar_track_alvar_msgs/AlvarMarkers
+    def __init__(self, header=None, markers=None):
+        self.header = header if header is not None else Header()
+        self.markers = markers if markers is not None else []
+
+
+class AckermannDrive:
+    def __init__(self):
+        self.steering_angle = 0.0
+        self.steering_angle_velocity = 0.0
+        self.speed = 0.0
+        self.acceleration = 0.0
+        self.jerk = 0.0
+
+
+class AckermannDriveStamped:
+    def __init__(self, header=None, drive=None):
+        self.header = header if header is not None else Header()
+        self.drive = drive if drive is not None else AckermannDrive()
+
+
+class Int32:
+    def __init__(self, data=0):
+        self.data = data
+
+
+class Bool:
+    def __init__(self, data=False):
+        self.data = data
+
+
+class Float32:
+    def __init__(self, data=0.0):
+        self.data = data
+
+
+class KeyValue:
+    def __init__(self, key='', value=''):
+        self.key = key
+        self.value = value
+
+
+class DiagnosticStatus:
+    OK = 0
+    WARN = 1
+    ERROR = 2
+    STALE = 3
+
+    def __init__(self, level=0, name='', message='', hardware_id='', values=None):
+        self.level = level
+        self.name = name
+        self.message = message
+        self.hardware_id = hardware_id
+        self.values = values if values is not None else []
+
+
+class DiagnosticArray:
+    def __init__(self, header=None, status=None):
+        self.header = header if header is not None else Header()
+        self.status = status if status is not None else []
+
+
+MESSAGE_MODULES = {
+    'std_msgs.msg': (Header, Int32, Bool, Float32),
+    'geometry_msgs.msg': (Point, Quaternion, Pose, PoseStamped),
+    'sensor_msgs.msg': (LaserScan,),
+    'obstacle_detector.msg': (Obstacles, CircleObstacle),
+    'ar_track_alvar_msgs.msg': (AlvarMarkers, AlvarMarker),
+    'ackermann_msgs.msg': (AckermannDriveStamped, AckermannDrive),
+    'diagnostic_msgs.msg': (DiagnosticArray, DiagnosticStatus, KeyValue),
+}
+
+
+########################## rospy 대역 ##########################
+
+class ROSException(Exception):
+    pass
+
+
+class ROSInterruptException(ROSException):
+    pass
+
+
+class ROSInternalException(Exception):
+    pass
+
+
+def topic_name(name):
+    return name.lstrip('/')
+
+
+class Core:
+    # 가상 시계, 토픽 연결, 예약된 입력 메시지
+    def __init__(self):
+        self.reset()
+
+    def reset(self, start_time=0.0, realtime=False, speed=1.0):
+        self.now = start_time
+        self.start_time = start_time
+        self.realtime = realtime
+        self.speed = speed
+        self.wall_start = time.perf_counter()
+        self.shutdown = False
+        self.node_name = None
+        self.subscribers = {}
+        self.published = {}
+        self.schedule = []  # (stamp, 순번, topic, 메시지 생성 함수)
+        self.sequence = 0
+        self.timers = []
+        self.log = []
+        self.verbose = False
+
+    def add_input(self, stamp, topic, make_msg):
+        heapq.heappush(self.schedule, (stamp, self.sequence, topic_name(topic), make_msg))
+        self.sequence += 1
+
+    def wait_until(self, stamp):
+        # 실시간 재생이면 실제 시간이 가상 시간을 따라잡을 때까지 대기
+        if self.realtime:
+            delay = (stamp - self.start_time) / self.speed - (time.perf_counter() - self.wall_start)
+            if delay > 0:
+                time.sleep(delay)
+
+    def advance(self, until):
+        # until까지 예약된 메시지를 순서대로 콜백에 전달
+        # 마지막 메시지를 처리할 한 주기를 남겨두고, 그다음 호출에서 종료
+        # 타이머는 메시지 사이사이에 시각 순서대로 실행
+        if not self.schedule:
+            self.shutdown = True
+            return
+        if until == float('inf'):
+            until = max(item[0] for item in self.schedule)
+        while True:
+            next_input = self.schedule[0][0] if self.schedule else float('inf')
+            timer = min(self.timers, key=lambda timer: timer.next_time) if self.timers else None
+            next_time = min(next_input, timer.next_time if timer else float('inf'))
+            if next_time > until:
+                break
+            self.wait_until(next_time)
+            self.now = max(self.now, next_time)
+            if timer is not None and timer.next_time <= next_input:
+                timer.fire()
+            else:
+                stamp, _, topic, make_msg = heapq.heappop(self.schedule)
+                self.deliver(topic, make_msg())
+        self.wait_until(until)
+        self.now = max(self.now, until)
+
+    def deliver(self, topic, msg):
+        for callback, callback_args in self.subscribers.get(topic, ()):
+            if callback_args is None:
+                callback(msg)
+            else:
+                callback(msg, callback_args)
+
+    def publish(self, topic, msg):
+        # 노드가 같은 메시지 객체를 계속 재사용하므로 기록은 복사본으로 남김
+        self.published.setdefault(topic, []).append((self.now, copy.deepcopy(msg)))
+        self.deliver(topic, msg)
+
+
+core = Core()
+
+
+def init_node(name, anonymous=False, **kwargs):
+    core.node_name = name
+
+
+def is_shutdown():
+    return core.shutdown
+
+
+def signal_shutdown(reason=''):
+    core.shutdown = True
+
+
+def get_time():
+    return core.now
+
+
+def spin():
+    core.advance(float('inf'))
+    core.shutdown = True
+
+
+def loginfo(msg, *args):
+    core.log.append((core.now, msg % args if args else msg))
+    if core.verbose:
+        print(msg % args if args else msg)
+
+
+logwarn = loginfo
+logerr = loginfo
+
+
+class Rate:
+    def __init__(self, hz):
+        self.period = 1.0 / hz
+
+    def sleep(self):
+        core.advance(core.now + self.period)
+
+
+class Subscriber:
+    def __init__(self, name, data_class, callback=None, callback_args=None, queue_size=None, **kwargs):
+        self.name = topic_name(name)
+        self.entry = (callback, callback_args)
+        core.subscribers.setdefault(self.name, []).append(self.entry)
+
+    def unregister(self):
+        core.subscribers.get(self.name, []).remove(self.entry)
+
+
+class TimerEvent:
+    def __init__(self, current_real):
+        self.current_real = Time(current_real)
+        self.current_expected = Time(current_real)
+
+
+class Timer:
+    def __init__(self, period, callback, oneshot=False):
+        self.period = period.to_sec()
+        self.callback = callback
+        self.oneshot = oneshot
+        self.next_time = core.now + self.period
+        core.timers.append(self)
+
+    def fire(self):
+        if self.oneshot:
+            self.shutdown()
+        else:
+            self.next_time += self.period
+        self.callback(TimerEvent(core.now))
+
+    def shutdown(self):
+        if self in core.timers:
+            core.timers.remove(self)
+
+
+class Publisher:
+    def __init__(self, name, data_class, queue_size=None, **kwargs):
+        self.name = topic_name(name)
+
+    def publish(self, msg):
+        core.publish(self.name, msg)
+
+
+def numpy_msg(msg_class):
+    # rospy.numpy_msg 대역: 재생 메시지의 배열 필드는 이미 numpy 배열
+    return msg_class
+
+
+def install():
+    # 현재 모듈을 rospy로, 메시지 클래스들을 각 메시지 패키지로 등록
+    sys.modules['rospy'] = sys.modules[__name__]
+    numpy_msg_module = types.ModuleType('rospy.numpy_msg')
+    numpy_msg_module.numpy_msg = numpy_msg
+    sys.modules['rospy.numpy_msg'] = numpy_msg_module
+    for module_name, classes in MESSAGE_MODULES.items():
+        package_name = module_name.split('.')[0]
+        package = sys.modules.get(package_name)
+        if package is None or not hasattr(package, '__path__'):
+            package = types.ModuleType(package_name)
+            package.__path__ = []
+            sys.modules[package_name] = package
+        module = types.ModuleType(module_name)
+        for cls in classes:
+            setattr(module, cls.__name__, cls)
+        package.msg = module
+        sys.modules[module_name] = module
+    return core
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 콜백/계획 단계 처리 시간 측정
+# - 측정값은 미리 할당한 링 버퍼 히스토그램에 저장 (측정 중 메모리 할당 없음)
+# - 주기적으로 p50/p95/p99/max를 /diagnostics (diagnostic_msgs/DiagnosticArray) 또는 파일(JSON lines)로 내보냄
+# - 환경 변수로 설정
+#     AUTORACE_INSTRUMENT=0          측정 끄기 (데코레이터가 원래 함수를 그대로 돌려줘서 비용 없음)
+#     AUTORACE_INSTRUMENT_PERIOD=5   내보내는 주기 [s]
+#     AUTORACE_INSTRUMENT_FILE=path  파일로 내보내기 (없으면 /diagnostics 발행)
+
+import os
+import json
+import time
+import functools
+import numpy as np
+
+enabled = os.environ.get('AUTORACE_INSTRUMENT', '1') != '0'
+histograms = {}
+exporter = None
+
+
+class Histogram:
+    def __init__(self, name, size=1024):
+        self.name = name
+        self.values = np.zeros(size)
+        self.index = 0
+        self.count = 0  # 전체 기록 수 (버퍼 크기를 넘으면 오래된 값부터 덮어씀)
+
+    def record(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count += 1
+
+    def stats(self):
+        filled = self.values[:min(self.count, len(self.values))]
+        if filled.size == 0:
+            return None
+        p50, p95, p99 = np.percentile(filled, (50, 95, 99))
+        return {'count': self.count, 'p50': p50, 'p95': p95, 'p99': p99, 'max': filled.max()}
+
+
+def histogram(name):
+    hist = histograms.get(name)
+    if hist is None:
+        hist = histograms[name] = Histogram(name)
+    return hist
+
+
+def record(name, value):
+    if enabled:
+        histogram(name).record(value)
+
+
+def record_age(name, now, stamp):
+    # 입력 메시지 stamp부터 now까지 걸린 시간 (stamp가 비어 있으면 기록 안 함)
+    if enabled and stamp > 0:
+        histogram(name).record(now - stamp)
+
+
+def timed(name):
+    # 함수 실행 시간 [s]을 name 히스토그램에 기록하는 데코레이터
+    def decorator(function):
+        if not enabled:
+            return function
+        hist = histogram(name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                hist.record(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Timer:
+    def __init__(self, name):
+        self.hist = histogram(name)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.record(time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+null_timer = NullTimer()
+
+
+def timer(name):
+    # with instrument.timer('이름'): 블록 실행 시간 기록
+    return Timer(name) if enabled else null_timer
+
+
+def snapshot():
+    return {name: stats for name, stats in ((name, hist.stats()) for name, hist in list(histograms.items())) if stats}
+
+
+class Exporter:
+    def __init__(self, node_name, period=None, path=None):
+        import rospy
+        self.rospy = rospy
+        self.node_name = node_name
+        self.path = path if path is not None else os.environ.get('AUTORACE_INSTRUMENT_FILE')
+        period = period if period is not None else float(os.environ.get('AUTORACE_INSTRUMENT_PERIOD', '5'))
+
+        self.diagnostics_pub = None
+        if self.path is None:
+            from diagnostic_msgs.msg import DiagnosticArray
+            self.diagnostics_pub = rospy.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
+        self.timer = rospy.Timer(rospy.Duration(period), self.export)
+
+    def export(self, event=None):
+        stats = snapshot()
+        if not stats:
+            return
+        if self.path is not None:
+            now = time.time()
+            with open(self.path, 'a') as f:
+                for name, values in stats.items():
+                    f.write(json.dumps(dict(time=now, node=self.node_name, name=name,
+                                            **{k: float(v) for k, v in values.items()})) + '\n')
+        else:
+            from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+            array = DiagnosticArray()
+            array.header.stamp = self.rospy.Time.now()
+            for name, values in stats.items():
+                status = DiagnosticStatus()
+                status.level = DiagnosticStatus.OK
+                status.name = f"{self.node_name}: {name}"
+                status.hardware_id = self.node_name
+                status.values = [KeyValue('count', str(values['count']))]
+                status.values += [KeyValue(f"{key}_ms", f"{values[key] * 1e3:.3f}") for key in ('p50', 'p95', 'p99', 'max')]
+                array.status.append(status)
+            self.diagnostics_pub.publish(array)
+
+
+def start_export(node_name, period=None, path=None):
+    # 노드에서 init_node 후 호출, 측정이 꺼져 있으면 아무것도 하지 않음
+    # 한 프로세스에 여러 노드가 있으면 (runner.py) 처음 만든 exporter 하나가 전부 내보냄
+    global exporter
+    if not enabled:
+        return None
+    if exporter is None:
+        exporter = Exporter(node_name, period, path)
+    return exporter
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 제어 경로용 비동기 로그
+# - logger.info(...)는 큐에 기록만 넣고 바로 반환, 실제 출력(rosout/파일)은 백그라운드 스레드가 수행
+# - 같은 메시지(또는 같은 key)는 period 초에 한 번만 기록, 그사이 건너뛴 횟수는 다음 기록에 repeated로 남김
+#   (여러 스레드에서 동시에 부르면 가끔 한 번 더 기록될 수 있음, 호출 경로에 락을 두지 않기 위한 선택)
+# - 포맷 인자(args)는 백그라운드 스레드에서 적용 (logger.info("age %.3f", age))
+# - 환경 변수로 설정
+#     AUTORACE_LOG_PERIOD=1.0      같은 메시지 최소 간격 [s]
+#     AUTORACE_LOG_FILE=path       JSON lines로 저장 (time, node, level, msg, repeated)
+#     AUTORACE_LOG_ROSOUT=0        rospy.loginfo/logwarn/logerr(rosout)로 보내지 않음
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+
+period = float(os.environ.get('AUTORACE_LOG_PERIOD', '1.0'))
+path = os.environ.get('AUTORACE_LOG_FILE')
+rosout = os.environ.get('AUTORACE_LOG_ROSOUT', '1') != '0'
+
+ROSPY_FUNCTIONS = {'info': 'loginfo', 'warn': 'logwarn', 'error': 'logerr'}
+records = queue.SimpleQueue()  # (wall time, level, msg, args, repeated) / 플러시 요청(threading.Event) / 종료(None)
+last = {}  # key -> [마지막 기록 시각(monotonic), 그 뒤로 건너뛴 수]
+writer = None
+writer_lock = threading.Lock()
+
+
+def log(level, msg, *args, key=None, min_period=None):
+    now = time.monotonic()
+    key = msg if key is None else key
+    entry = last.get(key)
+    if entry is not None and now - entry[0] < (period if min_period is None else min_period):
+        entry[1] += 1
+        return
+    repeated = entry[1] if entry is not None else 0
+    last[key] = [now, 0]
+    records.put((time.time(), level, msg, args, repeated))
+    if writer is None:
+        start()
+
+
+def info(msg, *args, **kwargs):
+    log('info', msg, *args, **kwargs)
+
+
+def warn(msg, *args, **kwargs):
+    log('warn', msg, *args, **kwargs)
+
+
+def error(msg, *args, **kwargs):
+    log('error', msg, *args, **kwargs)
+
+
+class Writer(threading.Thread):
+    def __init__(self):
+        super().__init__(name='logger', daemon=True)
+
+    def run(self):
+        import rospy
+        node = rospy.get_name() if hasattr(rospy, 'get_name') else ''
+        output = open(path, 'a') if path else None
+        try:
+            while True:
+                record = records.get()
+                if record is None:
+                    break
+                if isinstance(record, threading.Event):
+                    if output is not None:
+                        output.flush()
+                    record.set()
+                    continue
+
+                stamp, level, msg, args, repeated = record
+                try:
+                    text = msg % args if args else msg
+                except (TypeError, ValueError):
+                    text = f"{msg} {args}"
+                if rosout:
+                    getattr(rospy, ROSPY_FUNCTIONS[level])(text + (f" (repeated {repeated} times)" if repeated else ""))
+                if output is not None:
+                    output.write(json.dumps(dict(time=stamp, node=node, level=level, msg=text, repeated=repeated)) + '\n')
+                    if records.empty():
+                        output.flush()
+        finally:
+            if output is not None:
+                output.close()
+
+
+def start():
+    global writer
+    with writer_lock:
+        if writer is None:
+            writer = Writer()
+            writer.start()
+
+
+def flush(timeout=1.0):
+    # 지금까지 넣은 기록을 모두 내보낼 때까지 대기
+    if writer is None:
+        return True
+    done = threading.Event()
+    records.put(done)
+    return done.wait(timeout)
+
+
+def stop(timeout=1.0):
+    global writer
+    if writer is not None:
+        records.put(None)
+        writer.join(timeout)
+        writer = None
+
+
+def reset_after_fork():
+    # fork된 프로세스에는 writer 스레드가 없으므로 처음부터 다시 시작
+    global records, writer, writer_lock
+    records = queue.SimpleQueue()
+    last.clear()
+    writer = None
+    writer_lock = threading.Lock()
+
+
+atexit.register(stop)
+os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# /raw_obstacles, /scan, /ar_pose_marker 녹화 및 재생
+#
+# 녹화 (차량, ROS 필요):  python3 replay.py record run.arrec
+# 녹화 복구 (비정상 종료):  python3 replay.py finish run.arrec   (run.arrec.parts -> run.arrec)
+# 재생 (ROS 불필요):      python3 replay.py play run.arrec --node rubber_cone [--realtime] [--speed 2.0]
+#
+# 파일 형식: MAGIC + 헤더 길이(uint64) + JSON 헤더 + 64바이트 정렬된 컬럼들
+# 컬럼은 고정 dtype 배열이고 np.memmap으로 복사 없이 읽음
+#   obstacles/stamp (F,) f8, obstacles/header_stamp (F,) f8, obstacles/offset (F+1,) i8,
+#   obstacles/xy (M,2) f4, obstacles/radius (M,) f4
+#   scan/stamp (S,) f8, scan/header_stamp (S,) f8, scan/geometry (S,5) f8 [angle_min, angle_max, angle_increment, range_min, range_max],
+#   scan/ranges (S,B) f4
+#   markers/stamp (K,) f8, markers/header_stamp (K,) f8, markers/offset (K+1,) i8,
+#   markers/id (Q,) i4, markers/pose (Q,7) f4 [x, y, z, qx, qy, qz, qw]
+# stamp는 수신 시각이고 재생 순서는 stamp로 정함
+
+import os
+import sys
+import json
+import shutil
+import threading
+import time
+import argparse
+import importlib
+import numpy as np
+
+MAGIC = b'ARREC1\n'
+ALIGN = 64
+
+NODES = {
+    'rubber_cone': ('rubber_cone', 'Rubber_cone'),
+    'tunnel': ('tunnel', 'Tunnel'),
+    'choice_AB': ('choice_AB', 'AR'),
+}
+
+# 컬럼 이름: (dtype, 한 행의 모양), scan/ranges의 행 길이(빔 수)는 첫 스캔에서 정함
+# offset 컬럼은 녹화 중에는 프레임마다 끝 위치만 쓰고 파일로 합칠 때 앞에 0을 붙임
+COLUMNS = {
+    'obstacles/stamp': ('<f8', ()),
+    'obstacles/header_stamp': ('<f8', ()),
+    'obstacles/offset': ('<i8', ()),
+    'obstacles/xy': ('<f4', (2,)),
+    'obstacles/radius': ('<f4', ()),
+    'scan/stamp': ('<f8', ()),
+    'scan/header_stamp': ('<f8', ()),
+    'scan/geometry': ('<f8', (5,)),
+    'scan/ranges': ('<f4', None),
+    'markers/stamp': ('<f8', ()),
+    'markers/header_stamp': ('<f8', ()),
+    'markers/offset': ('<i8', ()),
+    'markers/id': ('<i4', ()),
+    'markers/pose': ('<f4', (7,)),
+}
+
+
+def write_columns(path, columns):
+    header = {}
+    offset = 0
+    for name, array in columns.items():
+        array = np.ascontiguousarray(array)
+        columns[name] = array
+        header[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGN) * ALIGN
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(data_start + header[name]['offset'])
+            array.tofile(f)  # memmap 컬럼도 한 번에 메모리로 올리지 않고 씀
+        f.truncate(data_start + offset)
+
+
+def read_columns(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a recording file")
+        header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_size).decode())
+    data_start = -(-(len(MAGIC) + 8 + header_size) // ALIGN) * ALIGN
+
+    columns = {}
+    for name, info in header.items():
+        dtype = np.dtype(info['dtype'])
+        shape = tuple(info['shape'])
+        if int(np.prod(shape)) == 0:
+            columns[name] = np.empty(shape, dtype=dtype)
+        else:
+            columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + info['offset'], shape=shape)
+    return columns
+
+
+########################## 메시지 <-> 배열 ##########################
+
+def obstacles_to_arrays(msg):
+    circles = msg.circles
+    xy = np.array([(c.center.x, c.center.y) for c in circles], dtype=np.float32).reshape(-1, 2)
+    radius = np.array([c.radius for c in circles], dtype=np.float32)
+    return xy, radius
+
+
+def scan_to_arrays(msg):
+    geometry = np.array([msg.angle_min, msg.angle_max, msg.angle_increment, msg.range_min, msg.range_max])
+    ranges = np.asarray(msg.ranges, dtype=np.float32)
+    return geometry, ranges
+
+
+def markers_to_arrays(msg):
+    ids = np.array([m.id for m in msg.markers], dtype=np.int32)
+    pose = np.array([(m.pose.pose.position.x, m.pose.pose.position.y, m.pose.pose.position.z,
+                      m.pose.pose.orientation.x, m.pose.pose.orientation.y, m.pose.pose.orientation.z,
+                      m.pose.pose.orientation.w) for m in msg.markers], dtype=np.float32).reshape(-1, 7)
+    return ids, pose
+
+
+class RecordingWriter:
+    # 녹화 중에는 컬럼마다 <path>.parts/<컬럼>.bin 파일에 이어 붙이고 (flush_period초마다 디스크에 씀)
+    # close()에서 한 파일로 합침 -> 메모리는 flush_period 동안의 데이터만 사용하고,
+    # 녹화가 비정상 종료되어도 parts는 남으므로 finish_recording(path)로 그때까지의 녹화를 복구할 수 있음
+    def __init__(self, path, flush_period=1.0):
+        self.path = path
+        self.parts = path + '.parts'
+        self.flush_period = flush_period
+        os.makedirs(self.parts)  # 이전 녹화의 parts가 남아 있으면 FileExistsError (먼저 finish로 복구)
+        self.buffers = {name: [] for name in COLUMNS}
+        self.files = {}
+        self.counts = {'obstacles': 0, 'markers': 0}  # 지금까지 쓴 콘/마커 수 (offset 컬럼)
+        self.scan_beams = None
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()  # 구독 콜백은 토픽마다 다른 스레드에서 호출됨
+
+    def add(self, group, values):
+        with self.lock:
+            for name, value in values.items():
+                dtype, row = COLUMNS[f'{group}/{name}']
+                if row is None:
+                    row = (self.scan_beams,)
+                self.buffers[f'{group}/{name}'].append(np.asarray(value, dtype=dtype).reshape((-1,) + row))
+            if time.monotonic() - self.last_flush >= self.flush_period:
+                self.flush_locked()
+
+    def add_obstacles(self, stamp, header_stamp, xy, radius):
+        self.counts['obstacles'] += len(xy)
+        self.add('obstacles', dict(stamp=stamp, header_stamp=header_stamp, offset=self.counts['obstacles'], xy=xy, radius=radius))
+
+    def add_scan(self, stamp, header_stamp, geometry, ranges):
+        if self.scan_beams is None:
+            self.scan_beams = len(ranges)
+            with open(os.path.join(self.parts, 'scan_beams'), 'w') as f:
+                f.write(str(self.scan_beams))
+        elif len(ranges) != self.scan_beams:
+            raise ValueError("scan size changed during recording")
+        self.add('scan', dict(stamp=stamp, header_stamp=header_stamp, geometry=geometry, ranges=ranges))
+
+    def add_markers(self, stamp, header_stamp, ids, pose):
+        self.counts['markers'] += len(ids)
+        self.add('markers', dict(stamp=stamp, header_stamp=header_stamp, offset=self.counts['markers'], id=ids, pose=pose))
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        for name, buffer in self.buffers.items():
+            if not buffer:
+                continue
+            f = self.files.get(name)
+            if f is None:
+                f = self.files[name] = open(part_path(self.parts, name), 'ab')
+            np.concatenate(buffer).tofile(f)
+            f.flush()
+            buffer.clear()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        finish_recording(self.path)
+
+
+def part_path(parts, name):
+    return os.path.join(parts, name.replace('/', '.') + '.bin')
+
+
+def read_scan_beams(parts):
+    try:
+        with open(os.path.join(parts, 'scan_beams')) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def finish_recording(path):
+    # <path>.parts의 컬럼 파일들을 한 녹화 파일로 합치고 parts를 지움
+    # 중간에 끊긴 녹화는 모든 컬럼이 다 쓰인 프레임까지만 사용
+    parts = path + '.parts'
+    scan_beams = read_scan_beams(parts) or 0
+    columns = {}
+    for name, (dtype, row) in COLUMNS.items():
+        if row is None:
+            row = (scan_beams,)
+        dtype = np.dtype(dtype)
+        row_size = dtype.itemsize * int(np.prod(row))
+        file_path = part_path(parts, name)
+        rows = os.path.getsize(file_path) // row_size if row_size and os.path.exists(file_path) else 0
+        if rows:
+            columns[name] = np.memmap(file_path, dtype=dtype, mode='r', shape=(rows,) + row)
+        else:
+            columns[name] = np.empty((0,) + row, dtype=dtype)
+
+    for group, frame_columns, item_columns in (('obstacles', ('stamp', 'header_stamp', 'offset'), ('xy', 'radius')),
+                                                ('scan', ('stamp', 'header_stamp', 'geometry', 'ranges'), ()),
+                                                ('markers', ('stamp', 'header_stamp', 'offset'), ('id', 'pose'))):
+        frames = min(len(columns[f'{group}/{name}']) for name in frame_columns)
+        if item_columns:
+            items = min(len(columns[f'{group}/{name}']) for name in item_columns)
+            ends = columns[f'{group}/offset']
+            while frames > 0 and ends[frames - 1] > items:
+                frames -= 1
+            items = int(ends[frames - 1]) if frames > 0 else 0
+            for name in item_columns:
+                columns[f'{group}/{name}'] = columns[f'{group}/{name}'][:items]
+            columns[f'{group}/offset'] = np.concatenate(([0], ends[:frames])).astype(np.int64)
+            frame_columns = frame_columns[:-1]
+        for name in frame_columns:
+            columns[f'{group}/{name}'] = columns[f'{group}/{name}'][:frames]
+
+    write_columns(path, columns)
+    columns.clear()  # memmap을 닫은 뒤 지움
+    shutil.rmtree(parts)
+
+
+class Recording:
+    def __init__(self, path):
+        self.columns = read_columns(path)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def obstacles(self, i):
+        start, end = self['obstacles/offset'][i:i + 2]
+        return self['obstacles/xy'][start:end], self['obstacles/radius'][start:end]
+
+    def scan(self, i):
+        return self['scan/geometry'][i], self['scan/ranges'][i]
+
+    def markers(self, i):
+        start, end = self['markers/offset'][i:i + 2]
+        return self['markers/id'][start:end], self['markers/pose'][start:end]
+
+    def duration(self):
+        stamps = [self[name] for name in ('obstacles/stamp', 'scan/stamp', 'markers/stamp') if len(self[name])]
+        if not stamps:
+            return 0.0, 0.0
+        return min(s[0] for s in stamps), max(s[-1] for s in stamps)
+
+
+########################## 녹화 노드 ##########################
+
+class Recorder:
+    def __init__(self, path):
+        import rospy
+        from rospy.numpy_msg import numpy_msg
+        from obstacle_detector.msg import Obstacles
+        from sensor_msgs.msg import LaserScan
+        from ar_track_alvar_msgs.msg import AlvarMarkers
+
+        self.rospy = rospy
+        self.path = path
+        self.writer = RecordingWriter(path)
+
+        rospy.init_node('recorder')
+        rospy.Subscriber("/raw_obstacles", Obstacles, self.obstacle_callback)
+        rospy.Subscriber("/scan", numpy_msg(LaserScan), self.lidar_callback)
+        rospy.Subscriber("/ar_pose_marker", AlvarMarkers, self.ar_callback)
+        rospy.on_shutdown(self.save)
+
+    def stamps(self, msg):
+        return self.rospy.get_time(), msg.header.stamp.to_sec()
+
+    def obstacle_callback(self, msg):
+        self.writer.add_obstacles(*self.stamps(msg), *obstacles_to_arrays(msg))
+
+    def lidar_callback(self, msg):
+        self.writer.add_scan(*self.stamps(msg), *scan_to_arrays(msg))
+
+    def ar_callback(self, msg):
+        self.writer.add_markers(*self.stamps(msg), *markers_to_arrays(msg))
+
+    def save(self):
+        self.writer.close()
+        self.rospy.loginfo(f"recording saved: {self.path}")
+
+
+########################## 재생 ##########################
+
+class Replay:
+    def __init__(self, recording, realtime=False, speed=1.0):
+        self.recording = recording if isinstance(recording, Recording) else Recording(recording)
+        self.realtime = realtime
+        self.speed = speed
+
+    def make_obstacles(self, i):
+        from fake_ros import Obstacles, CircleObstacle, Header, Point, Time
+        xy, radius = self.recording.obstacles(i)
+        circles = [CircleObstacle(Point(x, y), r) for (x, y), r in zip(xy.tolist(), radius.tolist())]
+        return Obstacles(Header(Time(self.recording['obstacles/header_stamp'][i]), seq=i), circles)
+
+    def make_scan(self, i):
+        from fake_ros import LaserScan, Header, Time
+        geometry, ranges = self.recording.scan(i)
+        angle_min, angle_max, angle_increment, range_min, range_max = geometry.tolist()
+        # numpy_msg(LaserScan)처럼 ranges는 녹화 파일을 그대로 보는 float32 배열
+        return LaserScan(Header(Time(self.recording['scan/header_stamp'][i]), seq=i), angle_min, angle_max,
+                         angle_increment, range_min, range_max, ranges)
+
+    def make_markers(self, i):
+        from fake_ros import AlvarMarkers, AlvarMarker, PoseStamped, Pose, Point, Quaternion, Header, Time
+        ids, pose = self.recording.markers(i)
+        header = Header(Time(self.recording['markers/header_stamp'][i]), seq=i)
+        markers = [AlvarMarker(marker_id, PoseStamped(header, Pose(Point(*p[:3]), Quaternion(*p[3:]))), header)
+                   for marker_id, p in zip(ids.tolist(), pose.tolist())]
+        return AlvarMarkers(header, markers)
+
+    def schedule(self, core):
+        for column, topic, make in (('obstacles/stamp', '/raw_obstacles', self.make_obstacles),
+                                    ('scan/stamp', '/scan', self.make_scan),
+                                    ('markers/stamp', '/ar_pose_marker', self.make_markers)):
+            for i, stamp in enumerate(self.recording[column].tolist()):
+                core.add_input(stamp, topic, lambda i=i, make=make: make(i))
+
+    def run(self, node):
+        # node: NODES의 이름 또는 노드 객체를 만드는 함수
+        import fake_ros
+        core = fake_ros.install()
+        start, end = self.recording.duration()
+        core.reset(start_time=start, realtime=self.realtime, speed=self.speed)
+        self.schedule(core)
+
+        if isinstance(node, str):
+            module_name, class_name = NODES[node]
+            factory = getattr(importlib.import_module(module_name), class_name)
+        else:
+            factory = node
+
+        wall_start = time.perf_counter()
+        instance = factory()
+        fake_ros.spin()  # 생성자 안에서 루프를 돌지 않는 노드(Tunnel)는 여기서 재생
+        wall_time = time.perf_counter() - wall_start
+
+        return ReplayResult(instance, core.published, end - start, wall_time)
+
+
+class ReplayResult:
+    def __init__(self, node, published, sim_time, wall_time):
+        self.node = node
+        self.published = published  # topic -> [(가상 시각, 메시지 복사본)]
+        self.sim_time = sim_time
+        self.wall_time = wall_time
+
+    def summary(self):
+        lines = [f"recording {self.sim_time:.1f}s replayed in {self.wall_time:.2f}s "
+                 f"(x{self.sim_time / max(self.wall_time, 1e-9):.1f})"]
+        for topic, messages in sorted(self.published.items()):
+            lines.append(f"  {topic}: {len(messages)} msgs")
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    record = sub.add_parser('record')
+    record.add_argument('path')
+    finish = sub.add_parser('finish')
+    finish.add_argument('path')
+    play = sub.add_parser('play')
+    play.add_argument('path')
+    play.add_argument('--node', choices=sorted(NODES), required=True)
+    play.add_argument('--realtime', action='store_true')
+    play.add_argument('--speed', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        import rospy
+        Recorder(args.path)
+        rospy.spin()
+    elif args.command == 'finish':
+        finish_recording(args.path)
+    else:
+        result = Replay(args.path, args.realtime, args.speed).run(args.node)
+        print(result.summary())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,18 +1,26 @@
 #!/usr/bin/env python3
 
 import rospy
-import numpy as np
+import time
+import instrument
+import logger
+from rospy.numpy_msg import numpy_msg
 from obstacle_detector.msg import Obstacles
-from math import sin,sqrt,atan2
+from sensor_msgs.msg import LaserScan
 from ackermann_msgs.msg import AckermannDriveStamped
+from cone_planner import ConeFeatures, ConePlanner, center_line_from
+from cone_map import ConeMap
+from scan_cones import ScanClusterer
+from scan_utils import scan_geometry, ranges_array
+from snapshot import SnapshotBuffer
 
 class Rubber_cone:
     def __init__(self):
         rospy.init_node('rubber_cone')
-        rospy.Subscriber("/raw_obstacles", Obstacles, self.obstacle_callback)
+        instrument.start_export('rubber_cone')
         self.is_obstacles = False
         self.obstacles = []
-        self.point_list = [] 
+        self.cone_frames = SnapshotBuffer(64, 2) # 콜백 -> 메인 루프: 콘 좌표 (N,2) + 그 프레임의 (ConeFeatures, 콘 지도 좌/우 라인)
 
         self.target_control_pub = rospy.Publisher('high_level/ackermann_cmd_mux/input/nav_1', AckermannDriveStamped, queue_size=1)
         
@@ -25,192 +33,182 @@ class Rubber_cone:
         self.target_control.drive.speed=0.4 # 최대 1.4 같음
         self.vehicle_length = 0.26
         self.lfd = 0.6
+        self.lookahead_mode = 'legacy' # 'legacy': 기존 look forward point 탐색, 'arc': 호 길이 재샘플링 경로 + 속도 비례 lfd
+        self.lfd_gain = 1.0 # arc 모드 lfd = clip(lfd_gain * speed, lfd, lfd_max) [s], 위 speed : lfd = 1 : 1.0 ~ 1.1 (0.6m/s 이상에서 속도에 비례)
+        self.lfd_max = 1.5 # arc 모드 lfd 최댓값 [m]
         self.distance_from_left_first_rubber_cone = 1.0
         self.distance_from_right_first_rubber_cone = 1.0
         self.distance_between_rubber_cone = 0.3
+        self.planning_mode = 'event' # 'event': Obstacles 수신 즉시 계획, 'rate': 기존 10Hz 고정 주기
+        self.max_frame_age = 0.15 # event 모드에서 이보다 오래된 프레임은 버림 [s]
+        self.latency_report_period = 5.0 # 지연 시간 통계 출력 주기 [s]
+        self.obstacle_source = 'obstacle_detector' # 'obstacle_detector': /raw_obstacles 사용, 'scan': /scan에서 직접 콘 검출
+        self.scan_clusterer = ScanClusterer(max_gap=0.1, min_points=2, max_width=0.3, max_range=3.0, cone_radius=0.05) # scan 모드 설정
+        self.use_cone_map = False # True: 프레임 사이에 콘 지도를 유지해서 좌/우 라인 구성
+        self.start_roi = (-1.3, 0.0, -0.6, 0.6) # 미션 시작 판단 영역 (x_min, x_max, y_min, y_max) [m], 환경에 맞게 수정 필요
+        self.start_count = 6 # 시작 영역 안에 이 개수 이상 콘이 있으면 미션 시작
+        self.continue_roi = (-1.0, 0.0, -1.0, 1.0) # 미션 진행 판단 영역 (x_min, x_max, y_min, y_max) [m], 환경에 맞게 수정 필요
+        self.continue_count = 4 # 진행 영역 안에 이 개수 이상 콘이 있으면 미션 계속
         ##################################
 
-        self.is_look_forward_point = False
+        self.build_planner()
 
         self.mission_start = False
 
-        rate = rospy.Rate(10)
+        # event 모드 지연 시간 통계
+        self.last_seq = None
+        self.planned_frames = 0
+        self.dropped_frames = 0
+        self.frame_age_sum = 0.0
+        self.frame_age_max = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.last_report_time = rospy.get_time()
+
+        # 콜백에서 distance_between_rubber_cone을 쓰기 때문에 파라미터 설정 후 구독
+        # event 모드는 queue_size=1로 계획이 밀리면 쌓인 프레임 대신 최신 프레임만 받음
+        queue_size = 1 if self.planning_mode == 'event' else None
+        if self.obstacle_source == 'scan':
+            rospy.Subscriber("/scan", numpy_msg(LaserScan), self.scan_callback, queue_size=queue_size)
+        else:
+            rospy.Subscriber("/raw_obstacles", Obstacles, self.obstacle_callback, queue_size=queue_size)
+
         ################### main #######################
-        while not rospy.is_shutdown():
-            if self.mission_start == False:
-                self.mission_start = self.rubber_cone_start()
+        if self.planning_mode == 'event':
+            rospy.spin() # 계획은 콜백(update_points)에서 수행
+        else:
+            rate = rospy.Rate(10)
+            while not rospy.is_shutdown():
+                self.mission_step()
+                rate.sleep()
+
+    def build_planner(self):
+        # 위 파라미터로 planner/콘 지도 생성 (sim.py에서 파라미터를 바꾼 뒤 다시 호출)
+        self.planner = ConePlanner(self.lfd, self.vehicle_length, self.distance_from_left_first_rubber_cone,
+                                   self.distance_from_right_first_rubber_cone, self.distance_between_rubber_cone,
+                                   self.lookahead_mode, self.lfd_gain, self.lfd_max)
+        self.cone_map = ConeMap(self.planner, gate=0.12, alpha=0.5, max_missed=5, behind_x=0.5)
+
+    def mission_step(self):
+        # 한 주기 동안 같은 프레임만 사용 (그사이 콜백이 새 프레임을 공개해도 섞이지 않음)
+        frame = self.cone_frames.latest
+        if frame is None:
+            return
+        features, map_lines = frame.data
+
+        if self.mission_start == False:
+            self.mission_start = self.rubber_cone_start(features)
+        else:
+            if self.rubber_cone_ing(features):
+                self.rubber_cone(frame)
             else:
-                if self.rubber_cone_ing():
-                    self.rubber_cone()
-                else:
-                    self.mission_start = False
-            rate.sleep()
+                self.mission_start = False
 
+    @instrument.timed('rubber_cone.obstacle_callback')
     def obstacle_callback(self, msg):
+        receive_time = time.perf_counter()
         self.is_obstacles = True
         self.obstacles = msg.circles
 
-        self.point_list = [] 
+        # 미리 할당한 버퍼에 바로 채움
+        points = self.cone_frames.begin(len(self.obstacles))
+        for i, obstacle in enumerate(self.obstacles):
+            points[i] = (obstacle.center.x, obstacle.center.y)
 
-        for obstacle in self.obstacles:
-            point=(obstacle.center.x,obstacle.center.y)
-            self.point_list.append(point)
+        self.update_points(points, msg, receive_time)
 
-    def add_line_points(self, points, current_point, line):
-        next_points = points[(points[:, 0] < current_point[0]) & (np.linalg.norm(points - current_point, axis=1) <= self.distance_between_rubber_cone)]
-        while next_points.size > 0:
-            next_point = next_points[np.argmin(np.linalg.norm(next_points, axis=1))]
-            if np.linalg.norm(next_point - current_point) <= self.distance_between_rubber_cone:
-                line.append(next_point)
-                current_point = next_point
-                next_points = points[(points[:, 0] < current_point[0]) & (np.linalg.norm(points - current_point, axis=1) <= self.distance_between_rubber_cone)]
-            else:
-                break
-
-    def rubber_cone_start(self):  # 러버콘 미션 시작 판단
-        count = 0  # 조건을 만족하는 점의 수를 세는 변수
-        for point in self.point_list:
-            x, y = point
-            if -1.3 < x < 0 and -0.6 < y < 0.6: # 환경에 맞게 수정 필요
-                count += 1
-                if count >= 6: # 환경에 맞게 수정 필요
-                    return True  # 조건을 만족하는 포인트가 6개 이상일 경우 True 반환
-                
-        return False  # 6개 미만일 경우 False 반환
+    @instrument.timed('rubber_cone.scan_callback')
+    def scan_callback(self, msg):
+        receive_time = time.perf_counter()
+        self.is_obstacles = True
+
+        # 스캔에서 콘 중심을 바로 구해서 /raw_obstacles와 같은 (x, y) 형식으로 사용
+        centers = self.scan_clusterer.cluster(ranges_array(msg), scan_geometry(msg))
+        points = self.cone_frames.begin(len(centers))
+        points[:] = centers
+
+        self.update_points(points, msg, receive_time)
+
+    def update_points(self, points, msg, receive_time):
+        # points: cone_frames.begin으로 연 슬롯 (채운 뒤 commit으로 메인 루프에 공개)
+        # 영역별 콘 수, 거리/각도, 좌우 구분은 한 번만 계산해서 시작/진행 판단과 planner가 같이 사용
+        rois = {'start': self.start_roi, 'continue': self.continue_roi}
+        if self.use_cone_map:
+            # 새 검출만 지도에 반영 (좌/우 라벨은 이전 프레임에서 이어짐), 라인도 여기서 구해서 프레임과 같이 공개
+            self.cone_map.update(points, msg.header.stamp.to_sec(), self.target_control.drive.speed)
+            features = ConeFeatures(points, rois)
+            map_lines = self.cone_map.lines()
+        else:
+            # 메시지마다 한 번만 이웃 그래프 생성 (planner에서 재사용)
+            features = ConeFeatures(points, rois, self.distance_between_rubber_cone)
+            map_lines = None
+        self.cone_frames.commit(len(points), msg.header.stamp.to_sec(), (features, map_lines))
+
+        if self.planning_mode == 'event':
+            self.plan_on_arrival(msg, receive_time)
+
+    def plan_on_arrival(self, msg, receive_time):
+        # 중간에 건너뛴 프레임 (queue_size=1에서 버려진 프레임) 수
+        if self.last_seq is not None and msg.header.seq > self.last_seq + 1:
+            self.dropped_frames += msg.header.seq - self.last_seq - 1
+        self.last_seq = msg.header.seq
+
+        # 너무 오래된 프레임은 계획하지 않음 (stamp가 비어 있으면 나이 0으로 취급)
+        now = rospy.get_time()
+        stamp = msg.header.stamp.to_sec()
+        frame_age = now - stamp if stamp > 0 else 0.0
+        if frame_age > self.max_frame_age:
+            self.dropped_frames += 1
+        else:
+            self.mission_step()
+            latency = time.perf_counter() - receive_time
+            self.planned_frames += 1
+            self.frame_age_sum += frame_age
+            self.frame_age_max = max(self.frame_age_max, frame_age)
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+
+        if now - self.last_report_time >= self.latency_report_period:
+            self.report_latency(now)
+
+    def report_latency(self, now):
+        planned = max(self.planned_frames, 1)
+        logger.info("rubber cone event planning: planned %d, dropped %d, frame age avg %.1fms max %.1fms, "
+                    "input->publish avg %.2fms max %.2fms",
+                    self.planned_frames, self.dropped_frames, self.frame_age_sum / planned * 1e3, self.frame_age_max * 1e3,
+                    self.latency_sum / planned * 1e3, self.latency_max * 1e3, key='rubber_cone.latency')
+        self.planned_frames = 0
+        self.dropped_frames = 0
+        self.frame_age_sum = 0.0
+        self.frame_age_max = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.last_report_time = now
+
+    def rubber_cone_start(self, features):  # 러버콘 미션 시작 판단
+        return features.counts['start'] >= self.start_count # 시작 영역 안의 콘이 start_count개 이상일 경우 True 반환
     
-    def rubber_cone_ing(self):  # 러버콘 미션 진행 판단
-        count = 0  # 조건을 만족하는 점의 수를 세는 변수
-
-        for point in self.point_list:
-            x, y = point
-            if -1.0 < x < 0 and -1.0 < y < 1.0: # 환경에 맞게 수정 필요
-                count += 1
-                if count >= 4: # 환경에 맞게 수정 필요
-                    return True  # 조건을 만족하는 포인트가 4개 이상일 경우 True 반환
-                
-        return False  # 4개 미만일 경우 False 반환
-
-    def rubber_cone(self):
-        if self.point_list:  # self.point_list가 비어있지 않은지 추가로 확인
-            points = np.array(self.point_list)
-            if points.size == 0:
-                return
-            
-            # 왼쪽과 오른쪽 포인트 초기화 및 라인 구성
-            left_line, right_line = [], []
-
-            # 왼쪽 포인트 초기화
-            left_points = points[(points[:, 1] < 0)]  # y < 0
-            if left_points.size > 0:
-                # 각도 필터링 (라디안을 도로 변환하여 -135도보다 큰 포인트 선택)
-                angles = np.degrees(np.arctan2(left_points[:, 1], left_points[:, 0]))
-                filtered_points = left_points[angles > -135]
-                if filtered_points.size > 0:
-                    current_point = filtered_points[np.argmin(np.linalg.norm(filtered_points, axis=1))]  # 조건을 만족하는 가장 가까운 포인트
-                else:
-                    current_point = left_points[np.argmin(np.linalg.norm(left_points, axis=1))]  # 조건을 만족하는 포인트가 없을 때 가장 가까운 포인트
-                #print(f"left_line_first_point_dis: {np.linalg.norm(current_point)}")
-                if np.linalg.norm(current_point) < self.distance_from_left_first_rubber_cone:  # 거리 0.8m 내
-                    left_line.append(current_point)
-                    self.add_line_points(points, current_point, left_line)
-
-            # 오른쪽 포인트 초기화
-            right_points = points[(points[:, 1] > 0)]  # y > 0
-            if right_points.size > 0:
-                # 각도 필터링 (라디안을 도로 변환하여 135도보다 작은 포인트 선택)
-                angles = np.degrees(np.arctan2(right_points[:, 1], right_points[:, 0]))
-                filtered_points = right_points[angles < 135]
-                if filtered_points.size > 0:
-                    current_point = filtered_points[np.argmin(np.linalg.norm(filtered_points, axis=1))]  # 조건을 만족하는 가장 가까운 포인트
-                else:
-                    current_point = right_points[np.argmin(np.linalg.norm(right_points, axis=1))]  # 조건을 만족하는 포인트가 없을 때 가장 가까운 포인트
-                #print(f"right_line_first_point_dis: {np.linalg.norm(current_point)}")
-                if np.linalg.norm(current_point) < self.distance_from_right_first_rubber_cone:
-                    right_line.append(current_point)
-                    self.add_line_points(points, current_point, right_line)
-
-            # 경로 데이터 초기화
-            center_line=[]
-            if left_line != [] and right_line != []:
-                left_size=len(left_line)
-                right_size=len(right_line)
-
-                if left_size > right_size:
-                    # 더 작은 배열의 크기에 맞춰서 center_line을 계산
-                    for i in range(right_size):
-                        # 왼쪽과 오른쪽 라인의 평균 위치 계산
-                        center_x = (left_line[i][0] + right_line[i][0]) / 2
-                        center_y = (left_line[i][1] + right_line[i][1]) / 2
-                        center_line.append((center_x, center_y))
-
-                    diff_x=center_line[right_size-1][0]-left_line[right_size-1][0]
-                    diff_y=center_line[right_size-1][1]-left_line[right_size-1][1]
-
-                    for i in range(right_size,left_size):
-                        center_x = left_line[i][0] + diff_x
-                        center_y = left_line[i][1] + diff_y
-                        center_line.append((center_x, center_y))
-
-                elif left_size < right_size:
-                    # 더 작은 배열의 크기에 맞춰서 center_line을 계산
-                    for i in range(left_size):
-                        # 왼쪽과 오른쪽 라인의 평균 위치 계산
-                        center_x = (left_line[i][0] + right_line[i][0]) / 2
-                        center_y = (left_line[i][1] + right_line[i][1]) / 2
-                        center_line.append((center_x, center_y))
-
-                    diff_x=center_line[left_size-1][0]-right_line[left_size-1][0]
-                    diff_y=center_line[left_size-1][1]-right_line[left_size-1][1]
-
-                    for i in range(left_size,right_size):
-                        center_x = right_line[i][0] + diff_x
-                        center_y = right_line[i][1] + diff_y
-                        center_line.append((center_x, center_y))
-                else:
-                    for left_point,right_point in zip(left_line,right_line):
-                        center_x=(left_point[0]+right_point[0]) / 2
-                        center_y=(left_point[1]+right_point[1]) / 2
-                        center_line.append((center_x, center_y))
-
-            elif left_line != [] and right_line == []:
-                diff_x = -left_line[0][0]
-                diff_y = -left_line[0][1]
-                for i in range(len(left_line)):
-                    center_x = left_line[i][0] + diff_x
-                    center_y = left_line[i][1] + diff_y
-                    center_line.append((center_x, center_y))
-
-            elif left_line == [] and right_line != []:
-                diff_x = -right_line[0][0]
-                diff_y = -right_line[0][1]
-                for i in range(len(right_line)):
-                    center_x = right_line[i][0] + diff_x
-                    center_y = right_line[i][1] + diff_y
-                    center_line.append((center_x, center_y))
-
-            if center_line == []:
-                self.target_control.drive.steering_angle=0
+    def rubber_cone_ing(self, features):  # 러버콘 미션 진행 판단
+        return features.counts['continue'] >= self.continue_count # 진행 영역 안의 콘이 continue_count개 이상일 경우 True 반환
+
+    @instrument.timed('rubber_cone.rubber_cone')
+    def rubber_cone(self, frame):
+        if frame.count:  # 프레임이 비어있지 않은지 추가로 확인
+            features, map_lines = frame.data
+            if map_lines is not None:
+                left_line, right_line = map_lines
+                steering_angle = self.planner.steering(center_line_from(left_line, right_line), self.target_control.drive.speed)
             else:
-                # center_line 리스트를 x 좌표에 따라 정렬
-                sorted_center_line = sorted(center_line, key=lambda point: point[0], reverse=True)
-                theta = 0
-
-                for point in sorted_center_line:
-                    dis = sqrt(point[0]**2 + point[1]**2)
-                    if dis >= self.lfd:
-                        self.is_look_forward_point = True
-                        theta = atan2(point[1]+sorted_center_line[0][1], point[0]+sorted_center_line[0][0])  # Correct order of arguments
-                        break
-
-                if self.is_look_forward_point:
-                    self.target_control.drive.steering_angle = -atan2(2 * self.vehicle_length * sin(theta), self.lfd)
-                    self.is_look_forward_point = False
-                else:
-                    theta = atan2(sorted_center_line[-1][1]+sorted_center_line[0][1], sorted_center_line[-1][0]+sorted_center_line[0][0])
-                    self.target_control.drive.steering_angle = -atan2(2 * self.vehicle_length * sin(theta), self.lfd)
-                
+                # 왼쪽/오른쪽 라인 구성, 중앙선 계산, look forward point 탐색은 cone_planner에서 처리
+                steering_angle = self.planner.plan(features.points, features=features, speed=self.target_control.drive.speed)
+
+            if not frame.valid():  # 계산하는 동안 슬롯이 다시 쓰였으면 버림 (다음 주기에 최신 프레임으로 계산)
+                return
+            self.target_control.drive.steering_angle = steering_angle
+            self.target_control.header.stamp = rospy.Time.now() # 발행 시각 (control에서 전달 지연 측정)
             self.target_control_pub.publish(self.target_control)
-            rospy.loginfo("rubber cone 미션 수행 중")
+            instrument.record_age('rubber_cone.input_age', rospy.get_time(), frame.stamp)
+            logger.info("rubber cone 미션 수행 중")
 
 if __name__ == '__main__':
     try:
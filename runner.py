@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 미션 노드들을 한 프로세스에서 실행 (python판 nodelet)
+# - rospy.init_node는 여기서 한 번만 호출, 각 노드 클래스는 자기 스레드에서 생성 (생성자 안의 루프/spin은 그대로)
+# - INTERNAL_TOPICS는 프로세스 안에서만 전달: 발행한 메시지 객체를 직렬화 없이 구독 콜백에 바로 넘김
+#   (발행한 스레드에서 콜백이 실행되므로 구독 쪽은 메시지 객체를 고치지 말고 필요한 값만 복사해서 사용)
+# - 나머지 토픽은 원래 rospy(TCPROS)로 송수신
+# - 각 노드 파일은 지금처럼 따로 실행 가능
+#
+# 실행:  python3 runner.py [--components control rubber_cone tunnel choice_AB]
+#        (ackermann_cmd_mux 대신 control이 mux 모드로 nav_* 입력을 직접 선택)
+# 비교:  python3 runner.py --compare
+#        따로 실행 중인 노드 프로세스들과 runner 프로세스의 메모리(RSS) 출력
+#        전달 지연은 두 경우 모두 /diagnostics의 control.receive_age (미션 발행 -> control 수신)로 비교
+
+import os
+import sys
+import time
+import types
+import argparse
+import threading
+import importlib
+
+########### 변경 가능 ##############
+COMPONENTS = { # 이름 -> (모듈, 클래스, 생성자 인자)
+    'control': ('control', 'control', {'control_mode': 'mux'}),
+    'rubber_cone': ('rubber_cone', 'Rubber_cone', {}),
+    'tunnel': ('tunnel', 'Tunnel', {}),
+    'choice_AB': ('choice_AB', 'AR', {}),
+}
+INTERNAL_TOPICS = ( # 프로세스 안에서만 주고받는 토픽
+    'high_level/ackermann_cmd_mux/input/nav_1',
+    'high_level/ackermann_cmd_mux/input/nav_5',
+)
+MIRROR_INTERNAL = False # True: 내부 토픽도 rospy로 같이 발행 (rostopic echo/rosbag 확인용, 직렬화 비용 발생)
+REPORT_PERIOD = 5.0 # 메모리/전달 통계 출력 주기 [s]
+##################################
+
+
+def topic_name(name):
+    return name.lstrip('/')
+
+
+class LocalBus:
+    # 프로세스 내부 토픽: topic -> [(callback, callback_args)]
+    def __init__(self, topics):
+        self.topics = {topic_name(topic) for topic in topics}
+        self.subscribers = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def is_local(self, name):
+        return topic_name(name) in self.topics
+
+    def subscribe(self, name, callback, callback_args):
+        entry = (callback, callback_args)
+        with self.lock:
+            # 발행 중인 스레드가 보는 리스트는 바꾸지 않고 새 리스트로 교체
+            self.subscribers[topic_name(name)] = self.subscribers.get(topic_name(name), []) + [entry]
+        return entry
+
+    def unsubscribe(self, name, entry):
+        with self.lock:
+            self.subscribers[topic_name(name)] = [e for e in self.subscribers.get(topic_name(name), []) if e is not entry]
+
+    def publish(self, name, msg):
+        name = topic_name(name)
+        self.counts[name] = self.counts.get(name, 0) + 1
+        for callback, callback_args in self.subscribers.get(name, ()):
+            if callback_args is None:
+                callback(msg)
+            else:
+                callback(msg, callback_args)
+
+
+def make_rospy(real, bus):
+    # 노드들이 import하는 rospy 대신 쓰는 모듈
+    # init_node는 무시하고 Publisher/Subscriber만 내부 토픽이면 bus로 연결, 나머지는 원래 rospy 그대로
+    module = types.ModuleType('rospy')
+    module.__dict__.update(real.__dict__)
+    module.component_names = []
+
+    def init_node(name, *args, **kwargs):
+        module.component_names.append(name)
+
+    class Publisher:
+        def __init__(self, name, data_class, *args, **kwargs):
+            self.name = name
+            self.local = bus.is_local(name)
+            self.publisher = None
+            if not self.local or MIRROR_INTERNAL:
+                self.publisher = real.Publisher(name, data_class, *args, **kwargs)
+
+        def publish(self, msg):
+            if self.local:
+                bus.publish(self.name, msg)
+            if self.publisher is not None:
+                self.publisher.publish(msg)
+
+        def get_num_connections(self):
+            local = len(bus.subscribers.get(topic_name(self.name), ())) if self.local else 0
+            return local + (self.publisher.get_num_connections() if self.publisher is not None else 0)
+
+        def unregister(self):
+            if self.publisher is not None:
+                self.publisher.unregister()
+
+    class Subscriber:
+        def __init__(self, name, data_class, callback=None, callback_args=None, *args, **kwargs):
+            self.name = name
+            self.entry = None
+            self.subscriber = None
+            if bus.is_local(name):
+                self.entry = bus.subscribe(name, callback, callback_args)
+            else:
+                self.subscriber = real.Subscriber(name, data_class, callback, callback_args, *args, **kwargs)
+
+        def unregister(self):
+            if self.entry is not None:
+                bus.unsubscribe(self.name, self.entry)
+            if self.subscriber is not None:
+                self.subscriber.unregister()
+
+    module.init_node = init_node
+    module.Publisher = Publisher
+    module.Subscriber = Subscriber
+    return module
+
+
+def rss_bytes(pid='self'):
+    # /proc/<pid>/status의 VmRSS [bytes], 읽을 수 없으면 None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def node_processes():
+    # 실행 중인 노드/runner 프로세스: [(pid, 스크립트 이름, RSS)]
+    scripts = {module_name + '.py' for module_name, class_name, kwargs in COMPONENTS.values()} | {'runner.py'}
+    result = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                args = f.read().decode(errors='replace').split('\0')
+        except OSError:
+            continue
+        for arg in args[:3]:
+            script = os.path.basename(arg)
+            if script in scripts:
+                rss = rss_bytes(pid)
+                if rss is not None:
+                    result.append((int(pid), script, rss))
+                break
+    return result
+
+
+def compare():
+    processes = node_processes()
+    if not processes:
+        print("no node processes found")
+        return
+    nodes = [p for p in processes if p[1] != 'runner.py']
+    runners = [p for p in processes if p[1] == 'runner.py']
+    for pid, script, rss in processes:
+        print(f"{pid:>8}  {script:<16}{rss / 2**20:8.1f} MiB")
+    if nodes:
+        print(f"{'multi-process':<26}{sum(p[2] for p in nodes) / 2**20:8.1f} MiB ({len(nodes)} processes)")
+    if runners:
+        print(f"{'single-process':<26}{sum(p[2] for p in runners) / 2**20:8.1f} MiB")
+
+
+class Runner:
+    def __init__(self, components):
+        import rospy as real
+        import instrument
+        from rospy.numpy_msg import numpy_msg  # 노드들이 쓰는 하위 모듈은 원래 rospy에서 미리 로드
+
+        real.init_node('autorace_runner')
+        instrument.start_export('autorace_runner')
+        self.real = real
+        self.bus = LocalBus(INTERNAL_TOPICS)
+        sys.modules['rospy'] = make_rospy(real, self.bus)
+
+        self.threads = []
+        self.instances = {}
+        self.errors = []
+        for name in components:
+            module_name, class_name, kwargs = COMPONENTS[name]
+            factory = getattr(importlib.import_module(module_name), class_name)
+            thread = threading.Thread(target=self.run_component, args=(name, factory, kwargs), name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            time.sleep(0.1) # 앞 노드의 구독이 먼저 등록되도록 (control이 먼저 떠 있어야 첫 명령을 받음)
+
+        self.previous_counts = {}
+        self.last_report_time = time.monotonic()
+        real.Timer(real.Duration(REPORT_PERIOD), self.report)
+        real.spin()
+
+    def run_component(self, name, factory, kwargs):
+        # 생성자가 루프/spin을 돌기 때문에 종료될 때까지 반환하지 않음
+        # 생성자 안에서 spin하지 않는 노드(Tunnel)는 여기서 대기 (콜백은 rospy 스레드에서 실행)
+        try:
+            self.instances[name] = factory(**kwargs)
+            self.real.spin()
+        except Exception as e:
+            self.errors.append((name, e))
+            self.real.logerr(f"runner: {name} stopped: {e!r}")
+
+    def report(self, event):
+        now = time.monotonic()
+        elapsed = max(now - self.last_report_time, 1e-9)
+        rss = rss_bytes()
+        rates = []
+        for topic, count in list(self.bus.counts.items()):
+            rates.append(f"{topic.split('/')[-1]} {(count - self.previous_counts.get(topic, 0)) / elapsed:.1f}Hz")
+            self.previous_counts[topic] = count
+        alive = sum(thread.is_alive() for thread in self.threads)
+        self.real.loginfo(f"runner: rss {rss / 2**20 if rss else float('nan'):.1f}MiB, "
+                          f"components {alive}/{len(self.threads)}, in-process " + (', '.join(rates) or '-'))
+        self.last_report_time = now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', nargs='+', choices=sorted(COMPONENTS), default=list(COMPONENTS))
+    parser.add_argument('--compare', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare()
+    else:
+        Runner(args.components)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# LaserScan에서 바로 러버콘 찾기 (obstacle_detector 노드 대신 사용)
+# 스캔 순서대로 이웃한 빔끼리 거리가 가까우면 같은 물체로 묶는 O(n) 클러스터링
+# 결과는 라이다 좌표계의 콘 중심 (N,2) 배열 -> /raw_obstacles의 circles 중심과 같은 좌표계
+
+import numpy as np
+
+
+class ScanClusterer:
+    def __init__(self, max_gap=0.1, min_points=2, max_width=0.3, max_range=3.0, cone_radius=0.05):
+        self.max_gap = max_gap  # 이웃한 두 포인트 사이가 이보다 멀면 다른 물체
+        self.min_points = min_points  # 이보다 적은 포인트로 된 물체는 잡음으로 봄
+        self.max_width = max_width  # 양 끝 포인트 거리가 이보다 크면 콘이 아님 (벽 등)
+        self.max_range = max_range  # 이보다 먼 빔은 사용하지 않음
+        # 빔은 라이다를 마주 보는 면에 몰려서 맞으므로 포인트 평균은 콘 표면 근처 -> 반지름만큼 바깥으로 보정
+        self.center_offset = cone_radius
+
+    def cluster(self, ranges, geometry):
+        valid = (ranges > 0) & (ranges < self.max_range)  # 0, inf, nan 빔 제외
+        index = np.flatnonzero(valid)
+        if index.size < self.min_points:
+            return np.empty((0, 2))
+
+        r = ranges[index].astype(np.float64)
+        x = r * geometry.cos[index]
+        y = r * geometry.sin[index]
+
+        # 스캔이 한 바퀴(360도)면 마지막 빔과 첫 빔도 이웃 -> 끊어지는 지점에서 시작하도록 회전
+        full_circle = geometry.size * geometry.angle_increment >= 2 * np.pi - 1.5 * geometry.angle_increment
+        gap = np.hypot(np.diff(x, append=x[0]), np.diff(y, append=y[0])) > self.max_gap  # gap[i]: i와 i+1 사이
+        if not full_circle:
+            gap[-1] = True
+        elif not gap.any():
+            return np.empty((0, 2))  # 전부 하나로 이어져 있으면 콘이 아님
+        shift = int(np.flatnonzero(gap)[-1]) + 1
+        if shift != x.size:
+            x, y, gap = np.roll(x, -shift), np.roll(y, -shift), np.roll(gap, -shift)
+
+        # 클러스터 구간 [start, end)
+        end = np.flatnonzero(gap) + 1
+        start = np.concatenate(([0], end[:-1]))
+        count = end - start
+
+        width = np.hypot(x[end - 1] - x[start], y[end - 1] - y[start])
+        keep = (count >= self.min_points) & (width <= self.max_width)
+        if not keep.any():
+            return np.empty((0, 2))
+
+        center_x = np.add.reduceat(x, start)[keep] / count[keep]
+        center_y = np.add.reduceat(y, start)[keep] / count[keep]
+
+        # 라이다에서 멀어지는 방향으로 보정
+        distance = np.hypot(center_x, center_y)
+        scale = (distance + self.center_offset) / np.maximum(distance, 1e-9)
+        return np.column_stack((center_x * scale, center_y * scale))
+
+
+def cone_scan_ranges(geometry, centers, radius=0.05, max_range=12.0):
+    # 원(콘)들이 놓인 장면의 스캔 (빔 x 콘 교차 계산, 테스트/시뮬레이션용)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    ranges = np.full(geometry.size, np.inf)
+    if len(centers) > 0:
+        # 빔 방향 d에서 |t*d - c| = radius를 만족하는 가장 작은 t
+        proj = np.outer(geometry.cos, centers[:, 0]) + np.outer(geometry.sin, centers[:, 1])
+        disc = proj ** 2 - (np.sum(centers ** 2, axis=1) - radius ** 2)
+        hit = np.where((disc >= 0) & (proj > 0), proj - np.sqrt(np.maximum(disc, 0)), np.inf)
+        ranges = hit.min(axis=1)
+    ranges[ranges > max_range] = np.inf
+    return ranges.astype(np.float32)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# LaserScan 공통 처리
+# 스캔 각도 구성(geometry)은 주행 중 바뀌지 않으므로 각도/인덱스 테이블을 한 번만 계산해서 재사용
+
+import numpy as np
+
+geometry_cache = {}
+
+
+class ScanGeometry:
+    def __init__(self, angle_min, angle_max, angle_increment, size):
+        self.angle_min = angle_min
+        self.angle_max = angle_max
+        self.angle_increment = angle_increment
+        self.size = size
+
+        # 빔 i의 각도 = angle_min + i * angle_increment
+        self.angles = angle_min + np.arange(size) * angle_increment
+        self.cos = np.cos(self.angles)
+        self.sin = np.sin(self.angles)
+        self.index_cache = {}
+
+    def index_from_max(self, angle):
+        # tunnel.py 방식 인덱스: (angle_max - angle) / angle_increment
+        index = self.index_cache.get(angle)
+        if index is None:
+            index = int((self.angle_max - angle) / self.angle_increment)
+            self.index_cache[angle] = index
+        return index
+
+
+def scan_geometry(msg):
+    key = (msg.angle_min, msg.angle_max, msg.angle_increment, len(msg.ranges))
+    geometry = geometry_cache.get(key)
+    if geometry is None:
+        geometry = ScanGeometry(*key)
+        geometry_cache[key] = geometry
+    return geometry
+
+
+def ranges_array(msg):
+    # numpy_msg(LaserScan)으로 구독하면 ranges가 이미 버퍼를 그대로 쓰는 float32 배열
+    ranges = msg.ranges
+    if isinstance(ranges, np.ndarray):
+        return ranges
+    if isinstance(ranges, (bytes, bytearray, memoryview)):
+        return np.frombuffer(ranges, dtype=np.float32)
+    return np.asarray(ranges, dtype=np.float32)
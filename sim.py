@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ROS 없이 돌리는 2D 자전거 모델 시뮬레이터 (파라미터 튜닝용)
+# - 러버콘 통로 / 터널 벽을 무작위로 만들고 Obstacles / LaserScan과 같은 입력을 기존 미션 노드(Rubber_cone, Tunnel)에 그대로 넣음
+#   (fake_ros로 rospy를 대신하므로 노드 코드는 그대로 사용)
+# - 파라미터 조합 x 시드를 프로세스 풀로 모든 CPU 코어에 나눠서 실행
+# - 결과: 횡방향 오차(평균/최대), 충돌, 완주 여부, 스텝 사이 조향 변화량(dsteer, 평균 [rad]), 스텝당 계산 시간
+#
+# 실행 예:
+#   python3 sim.py rubber_cone --grid lfd=0.4,0.5,0.6,0.7 speed=0.3,0.4,0.5 vehicle_length=0.2,0.26 --seeds 4
+#   python3 sim.py tunnel --grid kp=0.4,0.6,0.8 ki=0,0.004 kd=0.4,0.8 --seeds 4 --csv tunnel.csv
+#
+# 파라미터 이름은 노드의 속성 이름 (lfd, vehicle_length, distance_between_rubber_cone, estimation_mode ...)
+# 그 외: speed (목표 속도), kp/ki/kd (Tunnel PID 게인)
+
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+from math import pi, radians
+
+os.environ.setdefault('AUTORACE_INSTRUMENT', '0')  # 노드의 측정/내보내기는 끔 (계산 시간은 여기서 직접 잼)
+
+########### 변경 가능 ##############
+WHEELBASE = 0.26 # 실제 차량 축간거리 [m] (planner의 vehicle_length와 별개)
+MAX_STEERING = radians(25) # 조향 한계 [rad]
+BODY = (-0.1, 0.35, 0.11) # 차체 사각형 (라이다 기준 뒤쪽 끝, 앞쪽 끝, 반폭) [m]
+CONE_RADIUS = 0.05
+OBSTACLE_RANGE = 3.0 # obstacle_detector가 콘을 내보내는 최대 거리 [m]
+SCAN_BEAMS = 360
+SCAN_RANGE = 12.0
+WALL_RANGE = 3.0 # 이보다 먼 벽은 스캔에 넣지 않음 (터널 제어는 가까운 벽만 사용, 계산량 감소)
+DT = 0.1 # 센서 주기 [s] (/raw_obstacles, /scan 10Hz)
+SUBSTEPS = 5 # 센서 주기 사이 차량 적분 횟수
+##################################
+
+MISSIONS = {
+    # 미션 -> (모듈, 클래스, 입력 토픽, 출력 토픽)
+    'rubber_cone': ('rubber_cone', 'Rubber_cone', 'raw_obstacles', 'high_level/ackermann_cmd_mux/input/nav_1'),
+    'tunnel': ('tunnel', 'Tunnel', 'scan', 'high_level/ackermann_cmd_mux/input/nav_5'),
+}
+
+# 생성자에서 구독을 정할 때만 쓰는 속성 -> 노드를 만든 뒤에 바꾸면 적용되지 않으므로 --grid에서 거부
+CONSTRUCTOR_PARAMETERS = ('obstacle_source',)
+
+
+########################## 트랙 ##########################
+
+class Track:
+    # 중앙선 (간격 step인 점들)과 좌/우 경계 (콘 또는 벽)
+    def __init__(self, length=15.0, width=0.8, curvature=0.6, seed=0, step=0.05):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        s = np.arange(0.0, length + step, step)
+        # 곡률 = 파장이 다른 사인파 두 개의 합 [1/m]
+        wavelengths = rng.uniform(3.0, 8.0, 2)
+        phases = rng.uniform(0, 2 * pi, 2)
+        kappa = sum(curvature / 2 * np.sin(2 * pi * s / w + p) for w, p in zip(wavelengths, phases))
+        kappa[s < 1.5] = 0.0  # 시작 구간은 직선
+        self.heading = np.concatenate(([0.0], np.cumsum(kappa[:-1] * step)))
+        self.center = np.column_stack((np.concatenate(([0.0], np.cumsum(np.cos(self.heading[:-1]) * step))),
+                                       np.concatenate(([0.0], np.cumsum(np.sin(self.heading[:-1]) * step)))))
+        self.normal = np.column_stack((-np.sin(self.heading), np.cos(self.heading)))  # 왼쪽 방향
+        self.s = s
+        self.length = length
+
+    def offset_line(self, offset):
+        return self.center + offset * self.normal
+
+    def cones(self, spacing=0.25, start=0.3):
+        # 좌/우 경계를 따라 spacing 간격으로 놓인 콘 중심 (K,2)
+        index = np.flatnonzero(self.s >= start)[::max(int(round(spacing / (self.s[1] - self.s[0]))), 1)]
+        return np.concatenate((self.offset_line(self.width / 2)[index], self.offset_line(-self.width / 2)[index]))
+
+    def walls(self, segment_length=0.2):
+        # 좌/우 벽 선분 (S,4) [x0, y0, x1, y1]
+        every = max(int(round(segment_length / (self.s[1] - self.s[0]))), 1)
+        segments = []
+        for offset in (self.width / 2, -self.width / 2):
+            line = self.offset_line(offset)[::every]
+            segments.append(np.column_stack((line[:-1], line[1:])))
+        return np.concatenate(segments)
+
+    def locate(self, point, hint=0, window=40):
+        # point에서 가장 가까운 중앙선 점 (hint 주변만 탐색) -> (인덱스, 부호 있는 횡방향 오차, 진행 거리)
+        lo, hi = max(hint - window, 0), min(hint + window, len(self.center))
+        d = self.center[lo:hi] - point
+        index = lo + int(np.argmin(d[:, 0] ** 2 + d[:, 1] ** 2))
+        cte = float(np.dot(point - self.center[index], self.normal[index]))
+        return index, cte, float(self.s[index])
+
+
+########################## 차량 ##########################
+
+class Bicycle:
+    # 뒷바퀴 축 기준 기구학 자전거 모델 (라이다는 기준점에 있다고 가정)
+    def __init__(self, x=0.0, y=0.0, yaw=0.0, wheelbase=WHEELBASE, max_steering=MAX_STEERING):
+        self.x, self.y, self.yaw = x, y, yaw
+        self.wheelbase = wheelbase
+        self.max_steering = max_steering
+
+    def step(self, speed, steering, dt):
+        steering = max(-self.max_steering, min(self.max_steering, steering))
+        self.x += speed * np.cos(self.yaw) * dt
+        self.y += speed * np.sin(self.yaw) * dt
+        self.yaw += speed / self.wheelbase * np.tan(steering) * dt
+
+    @property
+    def position(self):
+        return np.array((self.x, self.y))
+
+    def to_lidar(self, points):
+        # 월드 좌표 -> 라이다 좌표 (라이다가 뒤집혀 있어서 전방 = -x, 왼쪽 = -y)
+        d = np.asarray(points) - self.position
+        c, s = np.cos(self.yaw), np.sin(self.yaw)
+        return np.column_stack((-(d[:, 0] * c + d[:, 1] * s), -(-d[:, 0] * s + d[:, 1] * c)))
+
+    def body_hits(self, points, radius):
+        # 차체 사각형과 겹치는 원(중심 points, 반지름 radius)이 있으면 True
+        local = -self.to_lidar(points)  # 차량 좌표 (전방 +x, 왼쪽 +y)
+        rear, front, half_width = BODY
+        return bool(np.any((local[:, 0] > rear - radius) & (local[:, 0] < front + radius) &
+                           (np.abs(local[:, 1]) < half_width + radius)))
+
+
+def ray_cast(origin, angles, segments, max_range):
+    # origin에서 angles 방향 빔과 선분들의 가장 가까운 교점 거리 (없으면 inf)
+    d = np.column_stack((np.cos(angles), np.sin(angles)))
+    a = segments[:, :2]
+    e = segments[:, 2:] - a
+    w = a - origin
+    denom = np.outer(d[:, 0], e[:, 1]) - np.outer(d[:, 1], e[:, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (w[:, 0] * e[:, 1] - w[:, 1] * e[:, 0]) / denom
+        u = (np.outer(d[:, 1], w[:, 0]) - np.outer(d[:, 0], w[:, 1])) / denom
+    hit = np.where((np.abs(denom) > 1e-12) & (t > 0) & (u >= 0) & (u <= 1), t, np.inf)
+    ranges = hit.min(axis=1)
+    ranges[ranges > max_range] = np.inf
+    return ranges
+
+
+########################## 입력 메시지 ##########################
+
+def make_obstacles(fake_ros, points, now, seq):
+    circles = [fake_ros.CircleObstacle(fake_ros.Point(x, y), CONE_RADIUS) for x, y in points.tolist()]
+    return fake_ros.Obstacles(fake_ros.Header(fake_ros.Time(now), seq=seq), circles)
+
+
+def make_scan(fake_ros, ranges, now, seq):
+    increment = 2 * pi / SCAN_BEAMS
+    return fake_ros.LaserScan(fake_ros.Header(fake_ros.Time(now), seq=seq), -pi, pi - increment, increment,
+                              0.05, SCAN_RANGE, ranges.astype(np.float32))
+
+
+########################## 실행 ##########################
+
+def make_node(fake_ros, mission, params):
+    # fake_ros 위에서 노드를 만들고 params를 적용
+    import importlib
+    module_name, class_name, input_topic, output_topic = MISSIONS[mission]
+    module = importlib.import_module(module_name)
+    node = getattr(module, class_name)()  # 입력 예약이 없으므로 생성자 안의 spin/루프는 바로 끝남
+
+    for name, value in params.items():
+        if name == 'speed':
+            node.target_control.drive.speed = value
+        elif name in ('kp', 'ki', 'kd'):
+            continue
+        elif name in CONSTRUCTOR_PARAMETERS:
+            raise ValueError(f"{class_name}.{name} only takes effect in the constructor (subscriptions are already set up)")
+        elif hasattr(node, name):
+            setattr(node, name, value)
+        else:
+            raise ValueError(f"{class_name} has no parameter {name!r}")
+    if mission == 'tunnel':
+        node.pid = module.PIDController(params.get('kp', node.pid.Kp), params.get('ki', node.pid.Ki), params.get('kd', node.pid.Kd))
+    else:
+        node.build_planner()
+    return node
+
+
+def run_case(case):
+    # case = (미션, 파라미터 dict, 시드, 설정 dict) -> 결과 dict
+    mission, params, seed, config = case
+    import fake_ros
+    core = fake_ros.install()
+    core.reset(start_time=0.0)
+    node = make_node(fake_ros, mission, params)
+    core.shutdown = False
+    module_name, class_name, input_topic, output_topic = MISSIONS[mission]
+
+    command = [node.target_control.drive.speed, 0.0]  # 미션 시작 전에는 목표 속도로 직진
+    commands = [0]
+
+    def command_callback(msg):
+        command[0], command[1] = msg.drive.speed, msg.drive.steering_angle
+        commands[0] += 1
+    fake_ros.Subscriber(output_topic, None, command_callback)
+
+    track = Track(config['length'], config['width'], config['curvature'], seed)
+    rng = np.random.default_rng(seed + 1000)
+    vehicle = Bicycle()
+    cones = track.cones(config['spacing']) if mission == 'rubber_cone' else None
+    walls = track.walls() if mission == 'tunnel' else None
+    beam_angles = -pi + np.arange(SCAN_BEAMS) * (2 * pi / SCAN_BEAMS)
+
+    index, cte_list, steering_list, step_times = 0, [], [], []
+    collisions, completed, off_track = 0, False, False
+    max_steps = int(track.length / max(command[0], 0.05) * 2 / DT)
+    for seq in range(max_steps):
+        now = seq * DT
+        core.now = now
+
+        # 센서 입력 생성
+        if mission == 'rubber_cone':
+            local = vehicle.to_lidar(cones)
+            visible = (np.hypot(local[:, 0], local[:, 1]) < OBSTACLE_RANGE) & (rng.random(len(local)) >= config['dropout'])
+            local = local[visible] + rng.normal(0, config['noise'], (int(visible.sum()), 2))
+            msg = make_obstacles(fake_ros, local, now, seq)
+        else:
+            near = np.hypot(walls[:, 0] - vehicle.x, walls[:, 1] - vehicle.y) < WALL_RANGE + 0.2
+            ranges = ray_cast(vehicle.position, beam_angles + vehicle.yaw + pi, walls[near], WALL_RANGE)
+            ranges = ranges + rng.normal(0, config['noise'], SCAN_BEAMS)
+            msg = make_scan(fake_ros, ranges, now, seq)
+
+        # 노드 계산 (콜백 + rate 모드면 한 주기)
+        start = time.perf_counter()
+        core.deliver(input_topic, msg)
+        if getattr(node, 'planning_mode', None) == 'rate':
+            node.mission_step()
+        step_times.append(time.perf_counter() - start)
+        core.published.clear()
+
+        # 차량 이동 (다음 센서 입력까지 같은 명령 유지)
+        for _ in range(SUBSTEPS):
+            vehicle.step(command[0], command[1], DT / SUBSTEPS)
+
+        index, cte, progress = track.locate(vehicle.position, index)
+        cte_list.append(abs(cte))
+        steering_list.append(command[1])
+        if mission == 'rubber_cone':
+            collisions += vehicle.body_hits(cones, CONE_RADIUS)
+        else:
+            heading_error = vehicle.yaw - track.heading[index]
+            rear, front, half_width = BODY
+            extent = max(abs(rear), front) * abs(np.sin(heading_error)) + half_width * abs(np.cos(heading_error))
+            collisions += abs(cte) + extent > track.width / 2
+        if abs(cte) > track.width:
+            off_track = True
+            break
+        if progress >= track.length - 0.5:
+            completed = True
+            break
+
+    cte_array = np.array(cte_list) if cte_list else np.zeros(1)
+    step_array = np.array(step_times) * 1e3
+    steering_change = np.abs(np.diff(steering_list)) if len(steering_list) > 1 else np.zeros(1)
+    return dict(mission=mission, seed=seed, **params,
+                cte_mean=float(cte_array.mean()), cte_max=float(cte_array.max()),
+                collisions=int(collisions), completed=completed, off_track=off_track,
+                steering_change=float(steering_change.mean()),
+                steps=len(step_times), commands=commands[0],
+                step_ms_mean=float(step_array.mean()), step_ms_p99=float(np.percentile(step_array, 99)))
+
+
+def parse_value(text):
+    # 'True'/'False' -> bool, 정수 -> int, 실수 -> float, 나머지는 문자열 ('False'가 문자열로 남으면 참이 됨)
+    if text in ('True', 'False'):
+        return text == 'True'
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_grid(items):
+    # ['lfd=0.4,0.6', 'speed=0.3'] -> [{'lfd': 0.4, 'speed': 0.3}, {'lfd': 0.6, 'speed': 0.3}]
+    names, values = [], []
+    for item in items:
+        name, text = item.split('=', 1)
+        names.append(name)
+        values.append([parse_value(v) for v in text.split(',')])
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def run_grid(mission, grid, seeds, config, workers=None):
+    cases = [(mission, params, seed, config) for params in grid for seed in range(seeds)]
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return [run_case(case) for case in cases]
+    # fork로 만든 작업 프로세스마다 fake_ros/노드 모듈을 한 번씩 로드
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(run_case, cases, chunksize=max(len(cases) // (workers * 4), 1))
+
+
+def summarize(results, names):
+    # 같은 파라미터 조합의 시드별 결과를 묶어서 (충돌률, 미완주율, 평균 오차) 순으로 정렬
+    groups = {}
+    for result in results:
+        groups.setdefault(tuple(result[name] for name in names), []).append(result)
+    rows = []
+    for key, group in groups.items():
+        rows.append(dict(zip(names, key),
+                         collision_rate=np.mean([r['collisions'] > 0 for r in group]),
+                         completion_rate=np.mean([r['completed'] for r in group]),
+                         cte_mean=np.mean([r['cte_mean'] for r in group]),
+                         cte_max=max(r['cte_max'] for r in group),
+                         steering_change=np.mean([r['steering_change'] for r in group]),
+                         step_ms_mean=np.mean([r['step_ms_mean'] for r in group]),
+                         step_ms_p99=max(r['step_ms_p99'] for r in group)))
+    rows.sort(key=lambda row: (row['collision_rate'], -row['completion_rate'], row['cte_mean']))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('mission', choices=sorted(MISSIONS))
+    parser.add_argument('--grid', nargs='*', default=[], help="name=v1,v2,... (노드 파라미터, speed, kp/ki/kd)")
+    parser.add_argument('--seeds', type=int, default=4, help="파라미터 조합마다 돌릴 트랙 수")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--length', type=float, default=15.0)
+    parser.add_argument('--width', type=float, default=None, help="통로 폭 [m] (기본: 러버콘 0.8, 터널 0.6)")
+    parser.add_argument('--curvature', type=float, default=None, help="최대 곡률 [1/m] (기본: 러버콘 0.6, 터널 0.1)")
+    parser.add_argument('--spacing', type=float, default=0.25, help="콘 간격 [m]")
+    parser.add_argument('--noise', type=float, default=0.01, help="콘 위치/스캔 거리 잡음 표준편차 [m]")
+    parser.add_argument('--dropout', type=float, default=0.0, help="콘 검출 누락 확률")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--csv', help="실행별 결과 저장 경로")
+    args = parser.parse_args(argv)
+
+    config = dict(length=args.length, spacing=args.spacing, noise=args.noise, dropout=args.dropout,
+                  width=args.width if args.width is not None else (0.8 if args.mission == 'rubber_cone' else 0.6),
+                  curvature=args.curvature if args.curvature is not None else (0.6 if args.mission == 'rubber_cone' else 0.1))
+    grid = parse_grid(args.grid) or [{}]
+    names = list(grid[0])
+
+    start = time.perf_counter()
+    results = run_grid(args.mission, grid, args.seeds, config, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} runs ({len(grid)} combinations x {args.seeds} seeds) in {elapsed:.1f}s")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    header = ''.join(f"{name:>16}" for name in names)
+    print(f"{header}{'collision':>10}{'complete':>10}{'cte_mean':>10}{'cte_max':>10}{'dsteer':>9}{'step_ms':>9}{'p99_ms':>9}")
+    for row in summarize(results, names)[:args.top]:
+        values = ''.join(f"{str(row[name]):>16}" if isinstance(row[name], (str, bool)) else f"{row[name]:>16.4g}" for name in names)
+        print(f"{values}{row['collision_rate']:10.2f}{row['completion_rate']:10.2f}{row['cte_mean']:10.3f}"
+              f"{row['cte_max']:10.3f}{row['steering_change']:9.4f}{row['step_ms_mean']:9.3f}{row['step_ms_p99']:9.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 구독 콜백 -> 메인 루프 데이터 전달 (락/복사 없음)
+# - 콜백은 미리 할당한 버퍼(슬롯) 중 하나에 값을 채운 뒤 Frame 참조 하나만 바꿔서 공개
+#   (파이썬에서 속성 대입은 원자적이라 읽는 쪽은 항상 완성된 프레임만 봄)
+# - 읽는 쪽은 latest를 한 번 읽어서 그 프레임만 사용 -> 한 주기 안에서 값이 바뀌지 않음
+# - 슬롯은 depth개를 돌려 쓰므로, 읽는 동안 depth-1번 넘게 새 프레임이 들어오면 그 슬롯이 덮어써질 수 있음
+#   계산이 끝난 뒤 frame.valid()로 확인하고, False면 결과를 버림 (seqlock 방식)
+
+import numpy as np
+
+
+class Frame:
+    __slots__ = ('slot', 'seq', 'count', 'stamp', 'data')
+
+    def __init__(self, slot, seq, count, stamp, data):
+        self.slot = slot
+        self.seq = seq
+        self.count = count
+        self.stamp = stamp  # 입력 메시지 stamp [s]
+        self.data = data  # 같이 넘길 객체 (이 프레임에서 만든 ConeIndex 등)
+
+    @property
+    def values(self):
+        # 슬롯 버퍼의 뷰 (복사 없음, 고치지 말 것)
+        return self.slot.array[:self.count]
+
+    def valid(self):
+        # 읽는 동안 슬롯이 다시 쓰이지 않았으면 True
+        return self.slot.seq == self.seq
+
+
+class Slot:
+    __slots__ = ('array', 'seq')
+
+    def __init__(self, array):
+        self.array = array
+        self.seq = 0
+
+
+class SnapshotBuffer:
+    def __init__(self, capacity, width, dtype=np.float64, depth=3):
+        # 한 프레임 = (개수, width) 배열, capacity보다 많이 들어오면 그 슬롯만 두 배로 늘림
+        self.width = width
+        self.slots = [Slot(np.zeros((capacity, width), dtype=dtype)) for _ in range(depth)]
+        self.index = 0
+        self.seq = 0
+        self.latest = None  # 가장 최근에 공개된 Frame (아직 없으면 None)
+
+    def begin(self, count):
+        # 다음 슬롯을 쓰기용으로 열고 채울 (count, width) 뷰를 돌려줌
+        self.index = (self.index + 1) % len(self.slots)
+        slot = self.slots[self.index]
+        slot.seq = -1  # 쓰는 중 (이 슬롯의 이전 프레임은 더 이상 valid 아님)
+        if count > len(slot.array):
+            slot.array = np.zeros((max(count, 2 * len(slot.array)), self.width), dtype=slot.array.dtype)
+        return slot.array[:count]
+
+    def commit(self, count, stamp=0.0, data=None):
+        # begin으로 채운 슬롯을 공개
+        self.seq += 1
+        slot = self.slots[self.index]
+        slot.seq = self.seq
+        frame = Frame(slot, self.seq, count, stamp, data)
+        self.latest = frame
+        return frame
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 import rospy
+import instrument
+import logger
+from rospy.numpy_msg import numpy_msg
 from sensor_msgs.msg import LaserScan
 from math import pi,radians
 from ackermann_msgs.msg import AckermannDriveStamped
+from scan_utils import scan_geometry, ranges_array
+from wall_fit import WallEstimator
 
 class PIDController:
     def __init__(self, kp, ki, kd):
@@ -23,9 +28,10 @@ class PIDController:
 class Tunnel:
     def __init__(self):
         rospy.init_node('tunnel')
-        rospy.Subscriber("/scan", LaserScan, self.lidar_callback)
+        instrument.start_export('tunnel')
         self.is_lidar=False
         self.points=[]
+        self.scan_stamp = 0.0
 
         self.target_control_pub = rospy.Publisher('high_level/ackermann_cmd_mux/input/nav_5', AckermannDriveStamped, queue_size=1)
         self.target_control = AckermannDriveStamped()
@@ -34,22 +40,36 @@ class Tunnel:
         self.distance_from_lidar_to_wall = 0.4
         self.pid = PIDController(0.6, 0.004, 0.8)
         self.max_steering_angle = 25
+        self.estimation_mode = 'two_beam' # 'two_beam': ±90도 두 빔, 'lsq': 측면 구간 전체 빔으로 벽 직선 근사
+        self.wall_estimator = WallEstimator(sector=(60, 150), max_range=1.0, min_beams=5) # lsq 모드 설정
+        self.heading_gain = 0.3 # lsq 모드에서 헤딩 오차 [rad]를 거리 오차 [m]에 더할 때의 가중치
         ################################
         self.target_control.drive.steering_angle=0 # 차량 바퀴 초기화
         self.normalization = 0 # 정규화 초기화
 
+        # 콜백에서 위 파라미터를 쓰기 때문에 파라미터 설정 후 구독
+        rospy.Subscriber("/scan", numpy_msg(LaserScan), self.lidar_callback) # ranges를 float32 배열로 바로 받음
 
+    @instrument.timed('tunnel.lidar_callback')
     def lidar_callback(self,msg):
         self.is_lidar=True
-        self.points=msg.ranges
-        
-        # LiDAR 데이터에서 정확한 90도와 -90도의 인덱스 계산
-        index_270 = int((msg.angle_max + radians(90)) / msg.angle_increment) # 왼쪽 
-        index_90 = int((msg.angle_max - radians(90)) / msg.angle_increment) # 오른쪽
+        self.points=ranges_array(msg)
+        self.scan_stamp = msg.header.stamp.to_sec()
+        geometry = scan_geometry(msg)
+
+        if self.estimation_mode == 'lsq':
+            self.lsq_control(geometry)
+        else:
+            self.two_beam_control(geometry)
+
+    def two_beam_control(self, geometry):
+        # LiDAR 데이터에서 정확한 90도와 -90도의 인덱스 (스캔 구성별로 한 번만 계산)
+        index_270 = geometry.index_from_max(-radians(90)) # 왼쪽 
+        index_90 = geometry.index_from_max(radians(90)) # 오른쪽
 
         # 정확한 90도와 -90도에서의 거리 값 추출
-        distance_270 = msg.ranges[index_90]
-        distance_90 = msg.ranges[index_270]
+        distance_270 = float(self.points[index_90])
+        distance_90 = float(self.points[index_270])
         #print(distance_270,distance_90)
 
         if 0 < distance_270 < self.distance_from_lidar_to_wall and 0 < distance_90 < self.distance_from_lidar_to_wall:
@@ -66,8 +86,29 @@ class Tunnel:
             else:
                 self.target_control.drive.steering_angle = 0
 
+            self.target_control.header.stamp = rospy.Time.now() # 발행 시각 (control에서 전달 지연 측정)
+            self.target_control_pub.publish(self.target_control)
+            instrument.record_age('tunnel.input_age', rospy.get_time(), self.scan_stamp)
+            logger.info("tunnel_mission_pub")
+
+    def lsq_control(self, geometry):
+        # 좌/우 벽을 직선으로 근사해서 횡방향 오차 + 헤딩 오차로 조향
+        estimate = self.wall_estimator.estimate(self.points, geometry)
+        if estimate is None:
+            return
+        distance_left, distance_right, heading = estimate
+
+        if distance_left < self.distance_from_lidar_to_wall and distance_right < self.distance_from_lidar_to_wall:
+            error = (distance_left - distance_right) + self.heading_gain * heading # 양수면 왼쪽으로 조향
+            self.normalization = self.max_steering_angle/(distance_left + distance_right)
+            steering = self.pid.compute(error)*self.normalization
+            steering = max(-self.max_steering_angle, min(self.max_steering_angle, steering))
+            self.target_control.drive.steering_angle = steering*pi/180
+
+            self.target_control.header.stamp = rospy.Time.now() # 발행 시각 (control에서 전달 지연 측정)
             self.target_control_pub.publish(self.target_control)
-            rospy.loginfo(f"tunnel_mission_pub")
+            instrument.record_age('tunnel.input_age', rospy.get_time(), self.scan_stamp)
+            logger.info("tunnel_mission_pub")
 
 
 if __name__ == '__main__':
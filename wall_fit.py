@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 터널 벽 직선 근사 (측면 구간의 모든 빔 사용)
+# 라이다는 뒤집혀 장착되어 있어 차량 전방이 라이다 -x, 차량 왼쪽이 라이다 -y 방향
+# (tunnel.py 두 빔 방식과 rubber_cone.py의 좌/우 판단과 같은 기준)
+# 차량 기준 좌표: f = 전방 거리, l = 왼쪽 거리, 각도 phi = 라이다 각도 + 180도
+
+import numpy as np
+from math import atan, sqrt
+
+
+class WallEstimator:
+    def __init__(self, sector=(60, 150), max_range=1.0, min_beams=5):
+        self.sector = sector  # 차량 기준 |phi| 범위 [도], 왼쪽 벽은 +, 오른쪽 벽은 -
+        self.max_range = max_range  # 이보다 먼 빔은 벽이 아닌 것으로 보고 제외
+        self.min_beams = min_beams  # 유효한 빔이 이보다 적으면 해당 벽은 추정하지 않음
+        self.sector_cache = {}
+
+    def sectors(self, geometry):
+        # 스캔 구성별로 좌/우 구간의 빔 인덱스와 단위 벡터를 한 번만 계산
+        sectors = self.sector_cache.get(geometry)
+        if sectors is None:
+            phi = np.degrees(np.arctan2(-geometry.sin, -geometry.cos))
+            low, high = self.sector
+            sectors = []
+            for side_mask in ((phi >= low) & (phi <= high), (phi <= -low) & (phi >= -high)):
+                index = np.flatnonzero(side_mask)
+                sectors.append((index, -geometry.cos[index], -geometry.sin[index]))
+            self.sector_cache[geometry] = sectors
+        return sectors
+
+    def fit(self, ranges, index, unit_f, unit_l):
+        # l = a + b * f 최소제곱 직선 -> (벽까지 수직 거리, 벽 방향 각도 [rad])
+        r = ranges[index].astype(np.float64)
+        valid = (r > 0) & (r < self.max_range)  # 0, inf, nan 빔 제외
+        if np.count_nonzero(valid) < self.min_beams:
+            return None
+
+        r = r[valid]
+        f = r * unit_f[valid]
+        l = r * unit_l[valid]
+        df = f - f.mean()
+        dl = l - l.mean()
+        sff = df @ df
+        if sff < 1e-9:
+            return None
+
+        b = (df @ dl) / sff
+        a = l.mean() - b * f.mean()
+        return abs(a) / sqrt(1 + b * b), atan(b)
+
+    def estimate(self, ranges, geometry):
+        # (왼쪽 벽 거리, 오른쪽 벽 거리, 헤딩 오차 [rad]), 한쪽이라도 추정 못 하면 None
+        # 헤딩 오차는 통로 방향 - 차량 방향 (양수면 통로가 왼쪽으로 틀어짐)
+        (left_index, left_f, left_l), (right_index, right_f, right_l) = self.sectors(geometry)
+        left = self.fit(ranges, left_index, left_f, left_l)
+        right = self.fit(ranges, right_index, right_f, right_l)
+        if left is None or right is None:
+            return None
+        return left[0], right[0], (left[1] + right[1]) / 2
+
+
+def corridor_ranges(geometry, left, right, heading=0.0, max_range=12.0):
+    # 차량 왼쪽 left [m], 오른쪽 right [m]에 벽이 있고 통로가 heading [rad]만큼 틀어진 터널의 스캔
+    phi = np.arctan2(-geometry.sin, -geometry.cos)
+    ranges = np.full(geometry.size, np.inf)
+    for offset, sign in ((left, 1.0), (right, -1.0)):
+        # 벽 법선 방향 (heading + sign*90도) 으로의 빔 성분
+        normal = np.sin(phi - heading) * sign
+        with np.errstate(divide='ignore'):
+            hit = np.where(normal > 1e-6, offset / normal, np.inf)
+        ranges = np.minimum(ranges, hit)
+    ranges[ranges > max_range] = np.inf
+    return ranges.astype(np.float32)
+
+
+if __name__ == '__main__':
+    # 스캔당 처리 시간 비교: 기존 두 빔 방식 vs 최소제곱 방식 (Tunnel.lidar_callback 전체)
+    import time
+    import fake_ros
+    fake_ros.install()
+    import tunnel
+    from fake_ros import LaserScan
+    from scan_utils import scan_geometry
+
+    repeat = 2000
+    for size in (360, 720, 1440, 2000, 4000):
+        msg = LaserScan(angle_min=-np.pi, angle_max=np.pi, angle_increment=2 * np.pi / size,
+                        range_min=0.05, range_max=12.0, ranges=np.zeros(size, dtype=np.float32))
+        msg.ranges = corridor_ranges(scan_geometry(msg), 0.25, 0.3, np.radians(5))
+
+        result = [f"beams={size:5d}"]
+        for mode in ('two_beam', 'lsq'):
+            node = tunnel.Tunnel()
+            node.estimation_mode = mode
+            node.target_control_pub.publish = lambda msg: None  # 발행 비용은 제외
+            node.lidar_callback(msg)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                node.lidar_callback(msg)
+            elapsed = (time.perf_counter() - start) / repeat
+            result.append(f"{mode}={elapsed * 1e6:7.1f}us steer={node.target_control.drive.steering_angle:+.3f}")
+        print('  '.join(result))